@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+BRREG API Lookup Tool - Benchmarks
+
+Performance benchmarks for the BRREG client. The benchmarks run against a
+local stand-in server that mimics the BRREG API, so results are repeatable
+and the real register is never loaded.
+
+Usage:
+  python benchmarks.py threads
+  python benchmarks.py threads --threads 1 2 4 8 16 32 --latency 0.02
+  python benchmarks.py decoders
+  python benchmarks.py decoders --payload recorded_search_page.json
+  python benchmarks.py bulk
+  python benchmarks.py bulk --file enheter_totalbestand.json.gz
+  python benchmarks.py download
+  python benchmarks.py download --concurrency 1 4 8 --bandwidth 2
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from brreg_lookup import (JSON_DECODERS, BRREGClient, BRREGRequestError, BulkDownload, EntityType, iter_json_array,
+                          read_bulk_file)
+
+
+STAND_IN_ORG_NUMBER_BASE = 910000000
+
+
+def make_entity(org_number: str) -> Dict:
+    """Build a realistic main entity document for the stand-in server."""
+    return {
+        "organisasjonsnummer": org_number,
+        "navn": f"BENCHMARK ENTITY {org_number} AS",
+        "organisasjonsform": {"kode": "AS", "beskrivelse": "Aksjeselskap"},
+        "naeringskode1": {"kode": "35.140", "beskrivelse": "Handel med elektrisitet"},
+        "forretningsadresse": {
+            "adresse": ["Forusbeen 50"],
+            "postnummer": "4035",
+            "poststed": "STAVANGER",
+            "kommunenummer": "1103",
+        },
+    }
+
+
+def make_full_entity(org_number: str) -> Dict:
+    """Build a main entity document with every field of a recorded /enheter response."""
+    entity = make_entity(org_number)
+    entity.update({
+        "postadresse": {
+            "land": "Norge", "landkode": "NO", "postnummer": "4035", "poststed": "STAVANGER",
+            "adresse": ["Postboks 8500"], "kommune": "STAVANGER", "kommunenummer": "1103",
+        },
+        "registreringsdatoEnhetsregisteret": "1995-03-12",
+        "registrertIMvaregisteret": True,
+        "antallAnsatte": 21,
+        "hjemmeside": "www.example.no",
+        "institusjonellSektorkode": {"kode": "2100", "beskrivelse": "Private aksjeselskaper mv."},
+        "registrertIForetaksregisteret": True,
+        "registrertIStiftelsesregisteret": False,
+        "registrertIFrivillighetsregisteret": False,
+        "konkurs": False,
+        "underAvvikling": False,
+        "underTvangsavviklingEllerTvangsopplosning": False,
+        "maalform": "Bokmål",
+        "_links": {"self": {"href": f"https://data.brreg.no/enhetsregisteret/api/enheter/{org_number}"}},
+    })
+    return entity
+
+
+def make_search_page(size: int) -> bytes:
+    """Build a search result page shaped like a recorded /enheter response."""
+    entities = [make_full_entity(str(STAND_IN_ORG_NUMBER_BASE + i)) for i in range(size)]
+    
+    page = {
+        "_embedded": {"enheter": entities},
+        "_links": {"self": {"href": "https://data.brreg.no/enhetsregisteret/api/enheter?navn=BENCHMARK"}},
+        "page": {"size": size, "totalElements": size, "totalPages": 1, "number": 0},
+    }
+    return json.dumps(page, ensure_ascii=False).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive handler answering /enheter/{nr} like the BRREG API."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+
+        if len(parts) >= 2 and parts[-2] == "enheter":
+            self._reply(200, json.dumps(make_entity(parts[-1])).encode())
+        else:
+            self._reply(404, b'{"status": 404}')
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class BulkStandInHandler(BaseHTTPRequestHandler):
+    """Serves a bulk file at /{endpoint}/lastned, honouring byte ranges like the download CDN."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    payload = b""
+    bandwidth = 0.0  # Bytes per second per connection; 0 for unlimited
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        size = len(self.payload)
+        start, end = 0, size - 1
+        requested = self.headers.get("Range", "")
+        if requested.startswith("bytes="):
+            first, _, last = requested[len("bytes="):].partition("-")
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+
+        self.send_response(206 if requested else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{size}"')
+        if requested:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        # A client that cancels a download drops the connection mid-body
+        with contextlib.suppress(BrokenPipeError, ConnectionResetError):
+            for offset in range(start, end + 1, 64 * 1024):
+                piece = self.payload[offset:min(offset + 64 * 1024, end + 1)]
+                self.wfile.write(piece)
+                if self.bandwidth:
+                    time.sleep(len(piece) / self.bandwidth)
+
+
+@contextlib.contextmanager
+def stand_in_server(handler_class: type = StandInHandler, **attributes) -> Iterator[str]:
+    """Run a stand-in server on a free local port, yielding its base URL."""
+    handler = type("Handler", (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_thread_benchmark(base_url: str, threads: int, total_requests: int) -> Tuple[float, int]:
+    """Run lookups from a shared client on a thread pool, returning (seconds, hits)."""
+    client = BRREGClient(base_url=base_url, pool_maxsize=threads)
+    org_numbers = [str(STAND_IN_ORG_NUMBER_BASE + i) for i in range(total_requests)]
+
+    # The client reports progress on stdout; keep it out of the benchmark table
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(client.lookup_by_number, org_numbers))
+        elapsed = time.perf_counter() - start
+
+    client.close()
+    return elapsed, sum(1 for result in results if result)
+
+
+def benchmark_threads(args: argparse.Namespace) -> None:
+    """Show lookup throughput scaling with the number of worker threads."""
+    print("🏁 Thread scaling benchmark (shared BRREGClient, per-thread sessions)")
+    print(f"Requests per run: {args.requests}, simulated latency: {args.latency * 1000:.0f} ms")
+    print("-" * 60)
+    print(f"{'Threads':>8} {'Seconds':>10} {'Req/s':>10} {'Speedup':>10}")
+
+    with stand_in_server(latency=args.latency) as base_url:
+        baseline = None
+        for threads in args.threads:
+            elapsed, hits = run_thread_benchmark(base_url, threads, args.requests)
+            throughput = hits / elapsed
+            baseline = baseline or throughput
+            print(f"{threads:>8} {elapsed:>10.2f} {throughput:>10.1f} {throughput / baseline:>9.1f}x")
+
+
+def time_decoder(decode, payload: bytes, repeat: int) -> float:
+    """Return the best seconds per decode over three rounds of ``repeat`` decodes."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            decode(payload)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def benchmark_decoders(args: argparse.Namespace) -> None:
+    """Compare the available JSON decoders on recorded or synthetic BRREG payloads."""
+    payloads: List[Tuple[str, bytes]] = [(path.name, path.read_bytes()) for path in args.payload]
+    if not payloads:
+        payloads = [(f"search page ({size} entities)", make_search_page(size)) for size in args.sizes]
+    
+    print(f"🏁 JSON decoder benchmark (available: {', '.join(JSON_DECODERS)})")
+    print("-" * 72)
+    print(f"{'Payload':<28} {'Decoder':>8} {'KiB':>8} {'µs/decode':>11} {'MB/s':>8} {'Speedup':>8}")
+    
+    for label, payload in payloads:
+        baseline = None
+        for name, decode in JSON_DECODERS.items():
+            seconds = time_decoder(decode, payload, args.repeat)
+            baseline = baseline or seconds
+            print(f"{label:<28} {name:>8} {len(payload) / 1024:>8.1f} {seconds * 1e6:>11.1f} "
+                  f"{len(payload) / seconds / 1e6:>8.1f} {baseline / seconds:>7.1f}x")
+
+
+def make_bulk_file(records: int) -> bytes:
+    """Build a gzipped JSON array shaped like the /enheter/lastned bulk download."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as stream:
+        stream.write(b"[")
+        for i in range(records):
+            entity = make_full_entity(str(STAND_IN_ORG_NUMBER_BASE + i))
+            stream.write((b"," if i else b"") + json.dumps(entity, ensure_ascii=False).encode())
+        stream.write(b"]")
+    return buffer.getvalue()
+
+
+def measure_reader(read: Callable[[gzip.GzipFile], int], payload: bytes) -> Tuple[int, float, int]:
+    """Run a bulk reader on a gzipped payload, returning (records, seconds, peak traced bytes)."""
+    start = time.perf_counter()
+    records = read(gzip.GzipFile(fileobj=io.BytesIO(payload)))
+    seconds = time.perf_counter() - start
+    
+    # Tracing slows allocation down, so memory is measured in a second, untimed run
+    tracemalloc.start()
+    read(gzip.GzipFile(fileobj=io.BytesIO(payload)))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return records, seconds, peak
+
+
+def benchmark_bulk(args: argparse.Namespace) -> None:
+    """Compare streaming and whole-file parsing of a gzipped bulk download."""
+    payload = args.file.read_bytes() if args.file else make_bulk_file(args.records)
+    parse = BRREGClient()._parse_organization_data
+    readers = {
+        "json.load": lambda stream: len(json.load(stream)),
+        "iter_json_array": lambda stream: sum(1 for _ in iter_json_array(stream)),
+        "  + parsing": lambda stream: sum(1 for record in iter_json_array(stream)
+                                          if parse(record, EntityType.HOVEDENHET)),
+    }
+    
+    print(f"🏁 Bulk file parsing benchmark ({len(payload) / 1e6:.1f} MB gzipped)")
+    print("-" * 60)
+    print(f"{'Reader':<18} {'Records':>10} {'Records/s':>12} {'Peak MiB':>10}")
+    
+    for name, read in readers.items():
+        records, seconds, peak = measure_reader(read, payload)
+        print(f"{name:<18} {records:>10,} {records / seconds:>12,.0f} {peak / 2**20:>10.1f}")
+
+
+def run_download(base_url: str, directory: str, args: argparse.Namespace, concurrency: int) -> BulkDownload:
+    """Start a segmented download of the stand-in bulk file."""
+    client = BRREGClient(base_url=base_url)
+    return BulkDownload(client, f"{base_url}/enheter/lastned", Path(directory) / "enheter.json.gz",
+                        segment_size=int(args.segment_size * 1e6), concurrency=concurrency).start()
+
+
+def benchmark_download(args: argparse.Namespace) -> None:
+    """Show segmented download speed by concurrency, and resumption after an interruption."""
+    payload = args.file.read_bytes() if args.file else make_bulk_file(args.records)
+    records = sum(1 for _ in iter_json_array(gzip.GzipFile(fileobj=io.BytesIO(payload))))
+
+    print(f"🏁 Segmented download benchmark ({len(payload) / 1e6:.1f} MB, "
+          f"{args.segment_size:g} MB segments, {args.bandwidth:g} MB/s per connection)")
+    print("-" * 60)
+    print(f"{'Segments at once':>16} {'Seconds':>10} {'MB/s':>10} {'Records OK':>12}")
+
+    with stand_in_server(BulkStandInHandler, payload=payload, bandwidth=args.bandwidth * 1e6) as base_url:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                path = run_download(base_url, directory, args, concurrency).result()
+                seconds = time.perf_counter() - start
+                verified = sum(1 for _ in read_bulk_file(path)) == records
+                print(f"{concurrency:>16} {seconds:>10.2f} {len(payload) / seconds / 1e6:>10.1f} {str(verified):>12}")
+
+        # Interrupt a download halfway, then resume it from its manifest
+        with tempfile.TemporaryDirectory() as directory:
+            download = run_download(base_url, directory, args, min(args.concurrency))
+            while download.downloaded_bytes < len(payload) // 2:
+                time.sleep(0.01)
+            download.cancel()
+            with contextlib.suppress(BRREGRequestError):
+                download.result()
+
+            resumed = run_download(base_url, directory, args, min(args.concurrency))
+            verified = sum(1 for _ in read_bulk_file(resumed.result())) == records
+            print(f"\nResumed after interruption: {resumed.resumed_bytes / 1e6:.1f} MB kept, "
+                  f"{resumed.downloaded_bytes / 1e6:.1f} MB fetched, records OK: {verified}")
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """Create and configure the benchmark argument parser."""
+    parser = argparse.ArgumentParser(description='🏁 BRREG API Lookup Tool - Benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    threads = subparsers.add_parser('threads', help='Throughput scaling with worker thread count')
+    threads.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                         help='Thread counts to benchmark')
+    threads.add_argument('--requests', type=int, default=400, help='Lookups per run')
+    threads.add_argument('--latency', type=float, default=0.02,
+                         help='Simulated server latency in seconds')
+    threads.set_defaults(func=benchmark_threads)
+
+    decoders = subparsers.add_parser('decoders', help='JSON decoding speed of the available decoders')
+    decoders.add_argument('--payload', type=Path, nargs='+', default=[], metavar='FILE',
+                          help='Recorded API response bodies to decode (default: synthetic search pages)')
+    decoders.add_argument('--sizes', type=int, nargs='+', default=[20, 100],
+                          help='Entities per synthetic search page')
+    decoders.add_argument('--repeat', type=int, default=200, help='Decodes per timing round')
+    decoders.set_defaults(func=benchmark_decoders)
+
+    bulk = subparsers.add_parser('bulk', help='Streaming versus whole-file parsing of a bulk download')
+    bulk.add_argument('--file', type=Path, metavar='FILE',
+                      help='Downloaded gzipped bulk file to parse (default: synthetic file)')
+    bulk.add_argument('--records', type=int, default=100000, help='Records in the synthetic file')
+    bulk.set_defaults(func=benchmark_bulk)
+
+    download = subparsers.add_parser('download', help='Segmented, resumable bulk download speed')
+    download.add_argument('--file', type=Path, metavar='FILE',
+                          help='Gzipped bulk file to serve (default: synthetic file)')
+    download.add_argument('--records', type=int, default=300000, help='Records in the synthetic file')
+    download.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8],
+                          help='Segments downloaded at once')
+    download.add_argument('--segment-size', type=float, default=0.5, help='Segment size in MB')
+    download.add_argument('--bandwidth', type=float, default=2.0,
+                          help='Simulated bandwidth per connection in MB/s (0 for unlimited)')
+    download.set_defaults(func=benchmark_download)
+
+    return parser
+
+
+def main() -> None:
+    """Run the selected benchmark."""
+    args = create_argument_parser().parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,18 +12,149 @@ License: MIT
 """
 
 import argparse
+import asyncio
+import contextlib
+import functools
+import gzip
+import io
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import re
+import signal
+import socket
+import sqlite3
 import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
 from enum import Enum
-from typing import Dict, List, Optional, Union
+from pathlib import Path
+from typing import (Any, BinaryIO, Callable, ContextManager, Dict, Hashable, Iterable, Iterator, List, NamedTuple,
+                    Optional, Set, Tuple, Union)
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from difflib import SequenceMatcher
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed by AsyncBRREGClient
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, a faster JSON decoder
+    orjson = None
 
 
 # API Configuration Constants
 BRREG_BASE_URL = "https://data.brreg.no/enhetsregisteret/api"
 REQUEST_TIMEOUT = 10
 MAX_SEARCH_RESULTS = 20
+MAX_BATCH_LOOKUP_SIZE = 100
+SEARCH_PAGE_SIZE = 100
+MAX_RESULT_WINDOW = 10000  # The API refuses page * size beyond this many results
+
+# Query Sharding Configuration
+SHARD_START_DATE = date(1995, 1, 1)  # Enhetsregisteret was established in 1995
+SHARD_FROM_DATE_PARAM = 'fraRegistreringsdatoEnhetsregisteret'
+SHARD_TO_DATE_PARAM = 'tilRegistreringsdatoEnhetsregisteret'
+
+# Concurrency Configuration
+MAX_WORKERS = 8
+DEFAULT_HEDGE_DELAY = 0.1
+DEFAULT_ASYNC_CONCURRENCY = 100
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_WARM_CONNECTIONS = 2  # Keep-alive connections opened by BRREGClient.warm()
+
+# Rate Limiting Configuration
+DEFAULT_RATE_LIMIT = 20.0  # Initial requests per second
+DEFAULT_MIN_RATE_LIMIT = 1.0
+DEFAULT_MAX_RATE_LIMIT = 200.0
+RATE_DECREASE_FACTOR = 0.5  # Multiplicative decrease of rate and concurrency on 429
+RATE_INCREASE_STEP = 1.0  # Additive increase, per "round" of successful requests
+DEFAULT_RETRY_AFTER = 1.0  # Seconds to back off when a 429 carries no Retry-After
+
+# Retry Configuration
+DEFAULT_RETRY_ATTEMPTS = 4  # Total attempts per request, including the first
+DEFAULT_RETRY_BASE_DELAY = 0.2
+DEFAULT_RETRY_MAX_DELAY = 5.0
+DEFAULT_RETRY_DEADLINE = 30.0  # Seconds per request across all attempts
+DEFAULT_RETRY_BUDGET_RATIO = 0.1  # Retries allowed per request sent
+DEFAULT_RETRY_BUDGET_RESERVE = 10  # Retries available up front, and the most that can be saved up
+# Request errors caused by the request itself, not the network or server; retrying cannot help
+NON_RETRYABLE_REQUEST_ERRORS = (requests.exceptions.InvalidURL, requests.exceptions.InvalidSchema,
+                                requests.exceptions.MissingSchema, requests.exceptions.InvalidHeader,
+                                requests.exceptions.URLRequired)
+
+# Circuit Breaker Configuration
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures that open an endpoint's circuit
+DEFAULT_CIRCUIT_RESET_TIMEOUT = 30.0  # Seconds an open circuit fails fast before a trial request
+
+# Adaptive Timeout and Hedging Configuration
+LATENCY_WINDOW = 500  # Recent response times kept per endpoint
+MIN_LATENCY_SAMPLES = 20  # Samples needed before timeouts adapt and requests are hedged
+DEFAULT_TIMEOUT_MULTIPLIER = 3.0  # Adaptive timeout = p99 latency × multiplier
+MIN_ADAPTIVE_TIMEOUT = 1.0
+MAX_ADAPTIVE_TIMEOUT = 30.0
+TIMEOUT_PERCENTILE = 99
+HEDGE_PERCENTILE = 95  # A duplicate request is sent once this percentile has elapsed
+
+# Lookup Cache Configuration
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_CACHE_TTL = 3600  # Seconds a found organization stays cached
+DEFAULT_NEGATIVE_CACHE_TTL = 300  # Seconds a confirmed "not found" stays cached
+DEFAULT_STALE_TTL = 0  # Seconds past the TTL a stale organization may be served while it refreshes
+
+# Persistent Response Cache Configuration
+DEFAULT_RESPONSE_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'brreg_lookup'
+DEFAULT_RESPONSE_CACHE_TTL = 86400  # Seconds a stored response is served without refetching
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESPONSE_CACHE_EVICTION_FRACTION = 0.1  # Share of entries dropped per eviction round
+
+# Local Mirror Configuration
+DEFAULT_MIRROR_DIR = Path(os.environ.get('XDG_DATA_HOME', Path.home() / '.local' / 'share')) / 'brreg_lookup'
+BULK_DOWNLOAD_TIMEOUT = 60  # Seconds without data before a bulk download is abandoned
+BULK_DOWNLOAD_ACCEPT = {
+    "enheter": "application/vnd.brreg.enhetsregisteret.enhet.v2+gzip;charset=UTF-8",
+    "underenheter": "application/vnd.brreg.enhetsregisteret.underenhet.v2+gzip;charset=UTF-8",
+}
+BULK_READ_CHUNK_SIZE = 1024 * 1024  # Characters of decompressed JSON parsed at a time
+MAX_BULK_ELEMENT_SIZE = 16 * 1024 * 1024  # Characters; a larger array element means the input is malformed
+MIRROR_INSERT_BATCH_SIZE = 10000
+MIRROR_PROGRESS_INTERVAL = 100000  # Records between progress reports while building
+BULK_SEGMENT_SIZE = 8 * 1024 * 1024  # Bytes fetched per Range request of a bulk download
+DEFAULT_DOWNLOAD_CONCURRENCY = 4  # Segments of one bulk download fetched at a time
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read from the network and written at a time
+DOWNLOAD_POLL_INTERVAL = 0.2  # Seconds between checks for new data while streaming a running download
+BulkOpener = Callable[[], ContextManager[BinaryIO]]  # Opens a stream of decompressed bulk JSON
+DEFAULT_INGEST_WORKERS = max(1, (os.cpu_count() or 1) - 2)  # Cores left over by the reader and the writer
+INGEST_QUEUE_DEPTH = 2  # Batches per worker queued between pipeline stages
+# Pipeline processes are spawned, not forked: forking while download threads hold locks can deadlock the child
+INGEST_START_METHOD = "spawn"
+MIRROR_SYNC_PAGE_SIZE = 1000  # Update feed changes fetched and applied per transaction
+MIRROR_SYNC_OVERLAP = timedelta(days=1)  # Bulk files are produced nightly, so replay the feed from a day earlier
+MIRROR_UPDATE_FEEDS = {'enheter': 'oppdaterteEnheter', 'underenheter': 'oppdaterteUnderenheter'}
+MIRROR_DELETION_TYPES = {'Sletting', 'Fjernet'}  # endringstype values of removed organizations
+
+# JSON Decoding Configuration
+JSONDecoder = Callable[[bytes], Any]
+JSON_DECODERS: Dict[str, JSONDecoder] = {"json": json.loads}
+if orjson is not None:
+    JSON_DECODERS["orjson"] = orjson.loads
+DEFAULT_JSON_DECODER = "orjson" if orjson is not None else "json"
 
 # Relevance Scoring Thresholds
 EXACT_MATCH_THRESHOLD = 0.95
@@ -38,12 +169,79 @@ WORD_ORDER_BONUS = 0.1
 MAX_RESULTS_TO_SHOW_SCORES = 3
 
 
+class BRREGError(Exception):
+    """Base class for errors raised by the BRREG clients."""
+
+
+class BRREGRequestError(BRREGError):
+    """Raised when a request still fails after the retry policy gave up."""
+    
+    def __init__(self, url: str, reason: str, status: Optional[int] = None):
+        self.url = url
+        self.reason = reason
+        self.status = status
+        super().__init__(f"Request to {url} failed: {reason}")
+
+
+class BRREGThrottledError(BRREGRequestError):
+    """Raised when the API keeps answering 429 Too Many Requests."""
+    
+    def __init__(self, url: str, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+        hint = f"; retry after {retry_after:.1f}s" if retry_after is not None else ""
+        super().__init__(url, f"BRREG API is throttling requests{hint}", 429)
+
+
+class BRREGCircuitOpenError(BRREGRequestError):
+    """Raised without sending a request while an endpoint's circuit breaker is open."""
+    
+    def __init__(self, url: str, endpoint: str, retry_in: float):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(url, f"circuit for /{endpoint} is open after repeated failures; "
+                              f"next attempt in {retry_in:.1f}s")
+
+
+class BRREGDeadlineExceeded(BRREGRequestError):
+    """Raised when a call's time budget runs out before it could be answered."""
+    
+    def __init__(self, url: str):
+        super().__init__(url, "time budget ran out")
+
+
+class BRREGIngestError(BRREGError):
+    """Raised when a process of a parallel mirror build fails."""
+
+
 class EntityType(Enum):
     """Enumeration for different types of entities in BRREG."""
     HOVEDENHET = "hovedenhet"
     UNDERENHET = "underenhet"
 
 
+class ProbeMode(Enum):
+    """Strategy for probing main entities and sub-entities in number lookups."""
+    SEQUENTIAL = "sequential"
+    PARALLEL = "parallel"
+    HEDGED = "hedged"
+
+
+class CircuitState(Enum):
+    """Circuit breaker states."""
+    CLOSED = "closed"  # Requests flow normally
+    OPEN = "open"  # Requests fail fast
+    HALF_OPEN = "half_open"  # A single trial request decides whether to close again
+
+
+@dataclass(frozen=True)
+class CircuitEvent:
+    """A circuit breaker state change."""
+    endpoint: str
+    previous: CircuitState
+    state: CircuitState
+    failures: int
+
+
 @dataclass
 class Address:
     """Data class representing an organization's address."""
@@ -91,6 +289,71 @@ class OrganizationInfo:
         return self.business_address or self.postal_address or Address([])
 
 
+@dataclass(frozen=True)
+class SearchFilters:
+    """Server-side search filters, mapped to the BRREG API's native query parameters.
+    
+    Multi-valued filters match any of the given values. Filters are sent
+    with the search request, so the API only returns matching rows.
+
+    Both BRREGClient and AsyncBRREGClient send the same filters to both
+    search endpoints. Only ``location_postal_codes`` differs per endpoint:
+    it maps to the business address of main entities and to the location
+    address of sub-entities.
+    """
+    municipality_numbers: Tuple[str, ...] = ()
+    industry_codes: Tuple[str, ...] = ()
+    organization_forms: Tuple[str, ...] = ()
+    postal_codes: Tuple[str, ...] = ()
+    location_postal_codes: Tuple[str, ...] = ()
+    registered_from: Optional[date] = None
+    registered_to: Optional[date] = None
+    min_employees: Optional[int] = None
+    max_employees: Optional[int] = None
+    bankrupt: Optional[bool] = None
+    under_liquidation: Optional[bool] = None
+    
+    def to_params(self, endpoint: str) -> Dict[str, str]:
+        """Build the query parameters for a search endpoint.
+        
+        Args:
+            endpoint: Endpoint being searched ("enheter" or "underenheter")
+            
+        Returns:
+            Query parameters for the set filters
+        """
+        # Main entities are located by business address, sub-entities by location address
+        location_field = 'forretningsadresse' if endpoint == "enheter" else 'beliggenhetsadresse'
+        
+        params = {
+            'kommunenummer': ",".join(self.municipality_numbers),
+            'naeringskode': ",".join(self.industry_codes),
+            'organisasjonsform': ",".join(self.organization_forms),
+            'postadresse.postnummer': ",".join(self.postal_codes),
+            f'{location_field}.postnummer': ",".join(self.location_postal_codes),
+            SHARD_FROM_DATE_PARAM: self.registered_from.isoformat() if self.registered_from else "",
+            SHARD_TO_DATE_PARAM: self.registered_to.isoformat() if self.registered_to else "",
+            'fraAntallAnsatte': "" if self.min_employees is None else str(self.min_employees),
+            'tilAntallAnsatte': "" if self.max_employees is None else str(self.max_employees),
+            'konkurs': "" if self.bankrupt is None else str(self.bankrupt).lower(),
+            'underAvvikling': "" if self.under_liquidation is None else str(self.under_liquidation).lower(),
+        }
+        return {key: value for key, value in params.items() if value}
+
+
+class ResultList(list):
+    """
+    A list of results that records whether a time budget cut it short.
+    
+    ``partial`` is True when the budget ran out before every request was
+    answered, so results may be missing.
+    """
+    
+    def __init__(self, items: Iterable = (), partial: bool = False):
+        super().__init__(items)
+        self.partial = partial
+
+
 class TextMatcher:
     """
     Utility class for intelligent text matching and relevance scoring.
@@ -116,97 +379,3293 @@ class TextMatcher:
             organization_name: The organization name to compare against
             
         Returns:
-            Relevance score between 0.0 and 1.0 (higher is more relevant)
+            Relevance score between 0.0 and 1.0 (higher is more relevant)
+        """
+        query_clean = TextMatcher._normalize_text(query)
+        name_clean = TextMatcher._normalize_text(organization_name)
+        
+        # Exact match gets highest score
+        if query_clean == name_clean:
+            return 1.0
+        
+        # Check if query is contained in name (case insensitive)
+        if query_clean in name_clean:
+            return 0.95
+        
+        # Check if name contains query
+        if name_clean in query_clean:
+            return 0.9
+        
+        # Use sequence matcher for fuzzy matching
+        similarity = SequenceMatcher(None, query_clean, name_clean).ratio()
+        
+        # Boost score if all words in query appear in name
+        query_words = set(query_clean.split())
+        name_words = set(name_clean.split())
+        
+        if query_words.issubset(name_words):
+            similarity += WORD_SUBSET_BONUS  # Boost for containing all words
+        
+        # Boost score for word order preservation
+        if TextMatcher._preserves_word_order(query_clean, name_clean):
+            similarity += WORD_ORDER_BONUS
+        
+        return min(similarity, 1.0)  # Cap at 1.0
+    
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """
+        Normalize text for comparison by converting to lowercase and stripping whitespace.
+        
+        Args:
+            text: Text to normalize
+            
+        Returns:
+            Normalized text string
+        """
+        return text.lower().strip()
+    
+    @staticmethod
+    def _preserves_word_order(query: str, name: str) -> bool:
+        """
+        Check if the word order from query is preserved in the organization name.
+        
+        This method checks if all words from the query appear in the same order
+        within the organization name, which indicates a more relevant match.
+        
+        Args:
+            query: The search query
+            name: The organization name
+            
+        Returns:
+            True if word order is preserved, False otherwise
+        """
+        query_words = query.split()
+        name_words = name.split()
+        
+        query_index = 0
+        for word in name_words:
+            if query_index < len(query_words) and word == query_words[query_index]:
+                query_index += 1
+        
+        return query_index == len(query_words)
+
+
+@dataclass(frozen=True)
+class Validators:
+    """HTTP cache validators used to revalidate a stored response."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    
+    @classmethod
+    def from_headers(cls, headers: Dict[str, str]) -> Optional["Validators"]:
+        """Extract validators from response headers, or None if there are none."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        return cls(etag, last_modified) if etag or last_modified else None
+    
+    def to_headers(self) -> Dict[str, str]:
+        """Build the conditional request headers for these validators."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CachedResponse(NamedTuple):
+    """A response stored in the persistent response cache."""
+    status: int
+    body: bytes
+    validators: Optional[Validators] = None
+
+
+class _ApiResponse(NamedTuple):
+    """Outcome of a GET request, whether served by the network or the response cache."""
+    status: int
+    data: Optional[Dict]
+    validators: Optional[Validators] = None
+    size: int = 0
+
+
+@dataclass
+class RevalidationStats:
+    """Counters describing what conditional revalidation saved."""
+    revalidations: int = 0
+    not_modified: int = 0
+    bytes_saved: int = 0
+    parse_calls_saved: int = 0
+
+
+@dataclass
+class HedgeStats:
+    """Counters describing hedged requests."""
+    hedged: int = 0
+    hedge_wins: int = 0
+
+
+@dataclass(frozen=True)
+class ConnectionTimings:
+    """Time spent opening one keep-alive connection, in seconds."""
+    dns: float
+    tcp: float
+    tls: float = 0.0
+    
+    @property
+    def total(self) -> float:
+        """Total connection setup time."""
+        return self.dns + self.tcp + self.tls
+
+
+@dataclass
+class ConnectionStats:
+    """Counters separating connection setup from server time."""
+    warmed_connections: int = 0
+    cold_requests: int = 0  # Requests that had to open a new connection
+    cold_seconds: float = 0.0
+    warm_requests: int = 0  # Requests sent on an already open connection
+    warm_seconds: float = 0.0
+    
+    @property
+    def mean_cold_latency(self) -> float:
+        """Mean latency of requests that opened a connection."""
+        return self.cold_seconds / self.cold_requests if self.cold_requests else 0.0
+    
+    @property
+    def mean_warm_latency(self) -> float:
+        """Mean latency of requests on an open connection, i.e. server time plus round trip."""
+        return self.warm_seconds / self.warm_requests if self.warm_requests else 0.0
+    
+    @property
+    def connection_overhead(self) -> float:
+        """Estimated connection setup cost paid by each cold request."""
+        if not self.cold_requests or not self.warm_requests:
+            return 0.0
+        return max(self.mean_cold_latency - self.mean_warm_latency, 0.0)
+
+
+@dataclass
+class MirrorSyncStats:
+    """Outcome of syncing one endpoint of the local mirror from its update feed."""
+    changes: int = 0
+    updated: int = 0
+    deleted: int = 0
+    checkpoint: Optional[int] = None  # oppdateringsid of the last change applied
+
+
+@dataclass
+class CacheStats:
+    """Counters describing lookup cache effectiveness."""
+    hits: int = 0
+    negative_hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache (positive or negative)."""
+        served = self.hits + self.negative_hits + self.stale_hits
+        total = served + self.misses
+        return served / total if total else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    """A cached lookup result, the monotonic time it expires and how to revalidate it."""
+    value: Optional[OrganizationInfo]
+    expires_at: float
+    validators: Optional[Validators] = None
+    size: int = 0
+    expired: bool = False
+
+
+class LookupCache:
+    """
+    Thread-safe, bounded LRU cache of lookup results keyed by organization number.
+    
+    Found organizations and confirmed misses (numbers that exist in neither
+    register) are cached with separate TTLs, so a short negative TTL can be
+    combined with a long positive one. When full, the least recently used
+    entry is evicted. Expired organizations that carry HTTP validators are
+    kept until evicted, so they can be revalidated instead of refetched.
+    
+    With a ``stale_ttl``, an organization past its TTL (the soft limit) can
+    still be served stale for ``stale_ttl`` more seconds (the hard limit)
+    while the client refreshes it in the background.
+    """
+    
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL, stale_ttl: float = DEFAULT_STALE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of cached org numbers (0 disables caching)
+            ttl: Seconds a found organization is served from the cache
+            negative_ttl: Seconds a confirmed miss is served from the cache
+            stale_ttl: Seconds past ``ttl`` a found organization may be served
+                stale while it is refreshed (0 disables stale serving)
+            clock: Monotonic time source, in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+    
+    @property
+    def stats(self) -> CacheStats:
+        """Snapshot of the hit, miss and eviction counters."""
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+    
+    def get(self, org_number: str) -> Tuple[bool, Optional[OrganizationInfo]]:
+        """Look up a cached result.
+        
+        Args:
+            org_number: Organization number to look up
+            
+        Returns:
+            Tuple of (hit, value); a hit with value None is a cached miss
+        """
+        with self._lock:
+            entry = self._entries.get(org_number)
+            
+            now = self._clock()
+            if entry is not None and entry.expires_at <= now:
+                if not entry.expired:
+                    entry.expired = True
+                    self._stats.expirations += 1
+                servable_stale = entry.value is not None and now < entry.expires_at + self.stale_ttl
+                if entry.validators is None and not servable_stale:
+                    del self._entries[org_number]
+                entry = None
+            
+            if entry is None:
+                self._stats.misses += 1
+                return False, None
+            
+            self._entries.move_to_end(org_number)
+            if entry.value is None:
+                self._stats.negative_hits += 1
+            else:
+                self._stats.hits += 1
+            return True, entry.value
+    
+    def get_stale(self, org_number: str) -> Optional[OrganizationInfo]:
+        """Return an expired organization still within its stale window, or None."""
+        with self._lock:
+            entry = self._entries.get(org_number)
+            if entry is None or entry.value is None:
+                return None
+            now = self._clock()
+            if not entry.expires_at <= now < entry.expires_at + self.stale_ttl:
+                return None
+            # get() already counted this lookup as a miss
+            self._stats.misses -= 1
+            self._stats.stale_hits += 1
+            return entry.value
+    
+    def get_expired(self, org_number: str) -> Optional[Tuple[OrganizationInfo, Validators, int]]:
+        """Return an expired organization that can be revalidated.
+        
+        Returns:
+            Tuple of (organization, validators, response size in bytes), or
+            None if there is no expired entry with validators
+        """
+        with self._lock:
+            entry = self._entries.get(org_number)
+            if entry is None or entry.value is None or entry.validators is None:
+                return None
+            if entry.expires_at > self._clock():
+                return None
+            return entry.value, entry.validators, entry.size
+    
+    def put(self, org_number: str, value: Optional[OrganizationInfo],
+            validators: Optional[Validators] = None, size: int = 0) -> None:
+        """Cache a found organization, or None for a confirmed miss.
+        
+        Args:
+            org_number: Organization number
+            value: Found organization, or None for a confirmed miss
+            validators: HTTP validators of the response the organization came from
+            size: Size in bytes of that response body
+        """
+        if self.max_size <= 0:
+            return
+        
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._entries[org_number] = _CacheEntry(value, self._clock() + ttl, validators, size)
+            self._entries.move_to_end(org_number)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+    
+    def renew(self, org_number: str, validators: Optional[Validators] = None) -> None:
+        """Restart the TTL of an entry confirmed unchanged by the server."""
+        with self._lock:
+            entry = self._entries.get(org_number)
+            if entry is None:
+                return
+            entry.expires_at = self._clock() + (self.ttl if entry.value is not None else self.negative_ttl)
+            entry.expired = False
+            if validators is not None:
+                entry.validators = validators
+            self._entries.move_to_end(org_number)
+    
+    def invalidate(self, org_number: str) -> None:
+        """Drop a cached result, if present."""
+        with self._lock:
+            self._entries.pop(org_number, None)
+    
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of raw API response bodies, keyed by request URL.
+    
+    The cache lives in a single database file under ``directory`` and is
+    shared by every process using the same directory, so repeated CLI runs
+    skip the network for responses they have already seen. The database runs
+    in WAL mode so concurrent readers do not block each other or a writer.
+    Responses expire after a TTL (404 responses after the shorter negative
+    TTL), and the least recently used entries are evicted once the database
+    grows beyond ``max_bytes``. Expired responses are kept with their
+    ETag/Last-Modified validators so they can be revalidated cheaply.
+    """
+    
+    FILENAME = "responses.sqlite3"
+    
+    def __init__(self, directory: Union[str, Path] = DEFAULT_RESPONSE_CACHE_DIR,
+                 ttl: float = DEFAULT_RESPONSE_CACHE_TTL, negative_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+                 max_bytes: int = DEFAULT_RESPONSE_CACHE_MAX_BYTES, clock: Callable[[], float] = time.time):
+        """Open (or create) the cache database.
+        
+        Args:
+            directory: Directory holding the cache database
+            ttl: Seconds a 200 response is served from the cache
+            negative_ttl: Seconds a 404 response is served from the cache
+            max_bytes: Size the database may grow to before entries are evicted
+            clock: Wall-clock time source, in seconds (shared across processes)
+        """
+        self.directory = Path(directory).expanduser()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.directory / self.FILENAME), timeout=30,
+                                           check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        
+        # Databases created before validators were stored lack their columns
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(responses)")}
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE responses ADD COLUMN {column} TEXT")
+    
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        """Build the cache key for a request: its fully encoded URL."""
+        return requests.Request('GET', url, params=params).prepare().url
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return a fresh cached response, or None."""
+        now = self._clock()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, body, etag, last_modified FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return self._to_cached_response(row)
+    
+    def get_expired(self, key: str, require_validators: bool = True) -> Optional[CachedResponse]:
+        """Return an expired 200 response, or None.
+        
+        Args:
+            key: Cache key from make_key()
+            require_validators: Only return responses that can be revalidated
+        """
+        query = ("SELECT status, body, etag, last_modified FROM responses "
+                 "WHERE key = ? AND expires_at <= ? AND status = 200")
+        if require_validators:
+            query += " AND (etag IS NOT NULL OR last_modified IS NOT NULL)"
+        with self._lock:
+            row = self._connection.execute(query, (key, self._clock())).fetchone()
+        return self._to_cached_response(row) if row else None
+    
+    def put(self, key: str, status: int, body: bytes, validators: Optional[Validators] = None) -> None:
+        """Store a response; only 200 and 404 responses are cached."""
+        if status not in (200, 404):
+            return
+        
+        now = self._clock()
+        ttl = self.ttl if status == 200 else self.negative_ttl
+        validators = validators or Validators()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, status, body, stored_at, expires_at, accessed_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, body, now, now + ttl, now, validators.etag, validators.last_modified)
+            )
+            self._evict()
+    
+    def renew(self, key: str, validators: Optional[Validators] = None) -> None:
+        """Restart the TTL of a response the server confirmed unchanged (304)."""
+        now = self._clock()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET expires_at = ? + CASE status WHEN 200 THEN ? ELSE ? END, accessed_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (now, self.ttl, self.negative_ttl, now,
+                 validators.etag if validators else None,
+                 validators.last_modified if validators else None, key)
+            )
+    
+    def size(self) -> int:
+        """Bytes of the database in use (excluding free pages)."""
+        with self._lock:
+            return self._size()
+    
+    def clear(self) -> None:
+        """Delete all cached responses."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+    
+    @staticmethod
+    def _to_cached_response(row: Tuple) -> CachedResponse:
+        status, body, etag, last_modified = row
+        validators = Validators(etag, last_modified) if etag or last_modified else None
+        return CachedResponse(status, bytes(body), validators)
+    
+    def _size(self) -> int:
+        page_size = self._connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._connection.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until the database fits in max_bytes."""
+        while self._size() > self.max_bytes:
+            count = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if not count:
+                return
+            batch = max(1, int(count * RESPONSE_CACHE_EVICTION_FRACTION))
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)", (batch,)
+            )
+
+
+class LocalMirror:
+    """
+    Local SQLite copy of the register, built from the bulk downloads (totalbestand).
+    
+    Lookups by number and name searches are answered from disk without the
+    network. Each organization is stored as its raw JSON document, and names
+    are indexed with SQLite FTS5 for word-prefix search. A mirror is built
+    into a temporary file that replaces the database only when complete, so
+    readers never see a half-built mirror.
+    """
+    
+    FILENAME = "mirror.sqlite3"
+    
+    def __init__(self, directory: Union[str, Path] = DEFAULT_MIRROR_DIR):
+        """Open the mirror database in ``directory``, creating an empty one if needed.
+        
+        Args:
+            directory: Directory holding the mirror database
+        """
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = self._connect(self.directory / self.FILENAME)
+        self._create_schema(self._connection)
+        self._create_indexes(self._connection)
+    
+    @property
+    def is_built(self) -> bool:
+        """Whether the mirror holds a completed build."""
+        return self.built_at is not None
+    
+    @property
+    def built_at(self) -> Optional[str]:
+        """UTC time the mirror's bulk data was downloaded, in ISO 8601, or None if never built."""
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        return row[0] if row else None
+    
+    def count(self, endpoint: Optional[str] = None) -> int:
+        """Number of mirrored organizations, optionally for one endpoint only."""
+        with self._lock:
+            if endpoint is None:
+                return self._connection.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+            return self._connection.execute("SELECT COUNT(*) FROM entities WHERE endpoint = ?",
+                                            (endpoint,)).fetchone()[0]
+    
+    def get(self, org_number: str) -> Optional[Tuple[str, bytes]]:
+        """Look up an organization, preferring main entities over sub-entities.
+        
+        Returns:
+            Tuple of (endpoint, raw JSON document), or None if not mirrored
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT endpoint, data FROM entities WHERE org_number = ? "
+                "ORDER BY endpoint = 'enheter' DESC LIMIT 1",
+                (org_number,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def search(self, name: str, endpoint: str, limit: int = MAX_SEARCH_RESULTS) -> List[bytes]:
+        """Find organizations whose name contains every word of ``name`` as a word prefix.
+        
+        Returns:
+            Raw JSON documents of the best ``limit`` matches by FTS rank
+        """
+        words = name.split()
+        if not words:
+            return []
+        # Quoted words are tokenized like the index, so punctuation and case do not matter
+        query = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT entities.data FROM names JOIN entities ON entities.id = names.rowid "
+                "WHERE names MATCH ? AND entities.endpoint = ? ORDER BY names.rank LIMIT ?",
+                (query, endpoint, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def checkpoint(self, endpoint: str) -> Optional[int]:
+        """Update feed id (oppdateringsid) of the last change synced for an endpoint, or None."""
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = ?",
+                                           (f'oppdateringsid:{endpoint}',)).fetchone()
+        return int(row[0]) if row else None
+    
+    def apply_changes(self, endpoint: str, records: Iterable[Dict], deletions: Iterable[str],
+                      checkpoint: int) -> None:
+        """Upsert and delete organizations and advance the sync checkpoint in one transaction.
+        
+        Args:
+            endpoint: Endpoint the organizations belong to
+            records: Current documents of new and changed organizations
+            deletions: Organization numbers to remove
+            checkpoint: oppdateringsid of the last change these cover
+        """
+        # An upsert rather than INSERT OR REPLACE, so the update trigger keeps the name index in sync
+        upsert = ("INSERT INTO entities (org_number, endpoint, name, data) VALUES (?, ?, ?, ?) "
+                  "ON CONFLICT (org_number, endpoint) DO UPDATE SET name = excluded.name, data = excluded.data")
+        with self._lock, self._connection:
+            self._connection.executemany(upsert, (self._row(endpoint, record) for record in records))
+            self._connection.executemany("DELETE FROM entities WHERE org_number = ? AND endpoint = ?",
+                                         ((org_number, endpoint) for org_number in deletions))
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                     (f'oppdateringsid:{endpoint}', str(checkpoint)))
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+    
+    @classmethod
+    def build(cls, directory: Union[str, Path], sources: Dict[str, Iterable[Dict]]) -> "LocalMirror":
+        """Build a new mirror from bulk records and move it into place.
+        
+        Args:
+            directory: Directory holding the mirror database
+            sources: Records per endpoint (``enheter``/``underenheter``),
+                consumed one at a time
+            
+        Returns:
+            The newly built mirror, opened
+        """
+        def ingest(connection: sqlite3.Connection) -> None:
+            for endpoint, records in sources.items():
+                cls._ingest(connection, endpoint, records)
+        
+        return cls._build(directory, ingest)
+    
+    @classmethod
+    def build_parallel(cls, directory: Union[str, Path], streams: Dict[str, BulkOpener],
+                       workers: int = DEFAULT_INGEST_WORKERS) -> "LocalMirror":
+        """Build a new mirror with a multiprocess ingestion pipeline and move it into place.
+        
+        For each endpoint, a reader process decompresses the bulk stream and
+        cuts it into batches of records, ``workers`` processes decode the
+        batches into rows, and this process writes the rows to SQLite.
+        Bounded queues between the stages keep memory flat when one stage
+        is slower than the others.
+        
+        Args:
+            directory: Directory holding the mirror database
+            streams: Openers of the decompressed bulk JSON per endpoint; they
+                run in the reader process, so they must be picklable, e.g.
+                ``functools.partial(open_bulk_download, 'enheter')``
+            workers: Number of decoding processes
+            
+        Returns:
+            The newly built mirror, opened
+            
+        Raises:
+            BRREGIngestError: If the reader or a worker fails
+        """
+        def ingest(connection: sqlite3.Connection) -> None:
+            for endpoint, opener in streams.items():
+                cls._ingest_parallel(connection, endpoint, opener, workers)
+        
+        return cls._build(directory, ingest)
+    
+    @classmethod
+    def _build(cls, directory: Union[str, Path], ingest: Callable[[sqlite3.Connection], None]) -> "LocalMirror":
+        """Fill a new database with ``ingest``, index it and swap it in for the current mirror."""
+        directory = Path(directory).expanduser()
+        directory.mkdir(parents=True, exist_ok=True)
+        building = directory / (cls.FILENAME + ".building")
+        if building.exists():
+            building.unlink()
+        
+        connection = cls._connect(building, bulk_load=True)
+        try:
+            cls._create_schema(connection)
+            built_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            ingest(connection)
+            
+            print("📦 Indexing names")
+            cls._create_indexes(connection)
+            connection.execute("INSERT INTO names(names) VALUES ('rebuild')")
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (built_at,))
+            connection.commit()
+        finally:
+            connection.close()
+        
+        os.replace(building, directory / cls.FILENAME)
+        return cls(directory)
+    
+    @staticmethod
+    def _ingest(connection: sqlite3.Connection, endpoint: str, records: Iterable[Dict]) -> int:
+        """Insert records in batched transactions, returning the number inserted."""
+        insert = "INSERT OR REPLACE INTO entities (org_number, endpoint, name, data) VALUES (?, ?, ?, ?)"
+        batch = []
+        count = 0
+        start = time.monotonic()
+        for record in records:
+            org_number = record.get('organisasjonsnummer')
+            if not org_number:
+                continue
+            batch.append(LocalMirror._row(endpoint, record))
+            count += 1
+            if len(batch) >= MIRROR_INSERT_BATCH_SIZE:
+                connection.executemany(insert, batch)
+                connection.commit()
+                batch.clear()
+            if count % MIRROR_PROGRESS_INTERVAL == 0:
+                print(f"📦 {endpoint}: {count:,} records ({count / (time.monotonic() - start):,.0f}/s)")
+        
+        connection.executemany(insert, batch)
+        connection.commit()
+        elapsed = time.monotonic() - start
+        print(f"📦 {endpoint}: {count:,} records in total ({count / elapsed if elapsed else 0:,.0f}/s)")
+        return count
+    
+    @staticmethod
+    def _ingest_parallel(connection: sqlite3.Connection, endpoint: str, opener: BulkOpener, workers: int) -> int:
+        """Insert the rows produced by a reader and worker processes, returning the number inserted."""
+        insert = "INSERT OR REPLACE INTO entities (org_number, endpoint, name, data) VALUES (?, ?, ?, ?)"
+        context = multiprocessing.get_context(INGEST_START_METHOD)
+        batches = context.Queue(maxsize=workers * INGEST_QUEUE_DEPTH)
+        rows = context.Queue(maxsize=workers * INGEST_QUEUE_DEPTH)
+        processes = [context.Process(target=_read_bulk_batches, args=(opener, batches, rows, workers), daemon=True)]
+        processes += [context.Process(target=_decode_bulk_batches, args=(endpoint, batches, rows), daemon=True)
+                      for _ in range(workers)]
+        
+        count = 0
+        uncommitted = 0
+        finished = 0
+        start = time.monotonic()
+        try:
+            for process in processes:
+                process.start()
+            
+            while finished < workers:
+                try:
+                    item = rows.get(timeout=1.0)
+                except queue.Empty:
+                    if any(process.exitcode not in (None, 0) for process in processes):
+                        raise BRREGIngestError(f"A mirror build process for {endpoint} exited unexpectedly")
+                    continue
+                if item is None:
+                    finished += 1
+                    continue
+                if isinstance(item, BRREGIngestError):
+                    raise item
+                
+                connection.executemany(insert, item)
+                uncommitted += len(item)
+                if uncommitted >= MIRROR_INSERT_BATCH_SIZE:
+                    connection.commit()
+                    uncommitted = 0
+                if (count + len(item)) // MIRROR_PROGRESS_INTERVAL > count // MIRROR_PROGRESS_INTERVAL:
+                    print(f"📦 {endpoint}: {count + len(item):,} records "
+                          f"({(count + len(item)) / (time.monotonic() - start):,.0f}/s)")
+                count += len(item)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            for pipeline_queue in (batches, rows):
+                pipeline_queue.cancel_join_thread()
+                pipeline_queue.close()
+        
+        connection.commit()
+        elapsed = time.monotonic() - start
+        print(f"📦 {endpoint}: {count:,} records in total ({count / elapsed if elapsed else 0:,.0f}/s, "
+              f"{workers} workers)")
+        return count
+    
+    @staticmethod
+    def _row(endpoint: str, record: Dict) -> Tuple[str, str, str, bytes]:
+        """Row of the entities table for an organization document."""
+        return (record['organisasjonsnummer'], endpoint, record.get('navn', ''),
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode())
+    
+    @staticmethod
+    def _connect(path: Path, bulk_load: bool = False) -> sqlite3.Connection:
+        """Open a mirror database; bulk loads skip journaling, as a failed build is discarded."""
+        connection = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        if bulk_load:
+            connection.execute("PRAGMA journal_mode=OFF")
+            connection.execute("PRAGMA synchronous=OFF")
+        else:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    @staticmethod
+    def _create_schema(connection: sqlite3.Connection) -> None:
+        """Create the tables; indexes are added after bulk loading, which is faster."""
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY,
+                org_number TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                name TEXT NOT NULL,
+                data BLOB NOT NULL,
+                UNIQUE (org_number, endpoint)
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(
+                name, content='entities', content_rowid='id', tokenize='unicode61 remove_diacritics 0'
+            );
+        """)
+    
+    @staticmethod
+    def _create_indexes(connection: sqlite3.Connection) -> None:
+        """Create the lookup index and the triggers keeping the name index in sync."""
+        connection.executescript("""
+            CREATE INDEX IF NOT EXISTS entities_org_number ON entities (org_number);
+            CREATE TRIGGER IF NOT EXISTS entities_insert AFTER INSERT ON entities BEGIN
+                INSERT INTO names(rowid, name) VALUES (new.id, new.name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entities_delete AFTER DELETE ON entities BEGIN
+                INSERT INTO names(names, rowid, name) VALUES ('delete', old.id, old.name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entities_update AFTER UPDATE ON entities BEGIN
+                INSERT INTO names(names, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO names(rowid, name) VALUES (new.id, new.name);
+            END;
+        """)
+
+
+class BulkDownload:
+    """
+    Resumable download of a bulk file in concurrent byte-range segments.
+    
+    The file is split into segments of ``segment_size`` bytes that are
+    fetched with HTTP Range requests on the download's own worker threads
+    (so the client's pool stays free for lookups) and the client's
+    sessions, lowest offsets first. Completed segments are recorded with
+    their CRC32 in a sidecar manifest (``<file>.manifest.json``). A new run
+    verifies the recorded segments against the file and fetches only the
+    rest, unless the server's copy changed (size, ETag or Last-Modified).
+    Servers without range support are read in a single, non-resumable stream.
+    
+    The manifest also tracks the completed prefix of the file, which
+    ``open_bulk_file()`` streams while the download is still running.
+    """
+    
+    MANIFEST_SUFFIX = ".manifest.json"
+    
+    def __init__(self, client: "BRREGClient", url: str, path: Union[str, Path],
+                 headers: Optional[Dict[str, str]] = None, segment_size: int = BULK_SEGMENT_SIZE,
+                 concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY):
+        """Prepare a download; ``start()`` begins it.
+        
+        Args:
+            client: Client whose sessions and retry policy are used
+            url: URL of the file
+            path: Where the file is stored; the manifest is stored beside it
+            headers: Extra request headers
+            segment_size: Bytes per Range request
+            concurrency: Segments fetched at a time
+        """
+        self.client = client
+        self.url = url
+        self.path = Path(path)
+        self.manifest_path = self.path.with_name(self.path.name + self.MANIFEST_SUFFIX)
+        self.segment_size = segment_size
+        self.concurrency = concurrency
+        self.downloaded_bytes = 0  # Bytes fetched by this run, not counting resumed segments
+        self._headers = headers or {}
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Any] = {}
+        self._pending: deque = deque()
+        self._futures: List[Future] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cancelled = threading.Event()
+    
+    @property
+    def size(self) -> Optional[int]:
+        """Size of the file in bytes, or None while unknown (no range support)."""
+        return self._manifest.get('size')
+    
+    @property
+    def resumed_bytes(self) -> int:
+        """Bytes of verified segments kept from an earlier run."""
+        return self._manifest.get('resumed', 0)
+    
+    def start(self) -> "BulkDownload":
+        """Probe the server, resume or restart the manifest and start fetching the missing segments.
+        
+        Raises:
+            requests.RequestException: If the server cannot be reached
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.client.session.get(self.url, headers=dict(self._headers, Range='bytes=0-0'), stream=True,
+                                     timeout=BULK_DOWNLOAD_TIMEOUT) as probe:
+            probe.raise_for_status()
+            content_range = probe.headers.get('Content-Range', '')
+            remote = {
+                'url': self.url,
+                'size': int(content_range.rsplit('/', 1)[1]) if probe.status_code == 206 else None,
+                'etag': probe.headers.get('ETag'),
+                'last_modified': probe.headers.get('Last-Modified'),
+                'segment_size': self.segment_size,
+            }
+        
+        manifest = self._load_manifest()
+        if remote['size'] is not None and all(manifest.get(key) == value for key, value in remote.items()):
+            manifest['segments'] = self._verified_segments(manifest)
+            manifest['error'] = None
+        else:
+            manifest = dict(remote, segments={}, complete=False, prefix=0, error=None)
+        with open(self.path, 'ab'):
+            pass  # Segments are written in place, so the file must exist at its full size
+        os.truncate(self.path, remote['size'] or 0)
+        manifest['resumed'] = sum(self._segment_length(manifest, int(index)) for index in manifest['segments'])
+        
+        # Each task holds its thread until the file is done, so it gets threads of its own
+        self._executor = ThreadPoolExecutor(max_workers=max(self.concurrency, 1),
+                                            thread_name_prefix=f"brreg-download-{self.path.name}")
+        with self._lock:
+            self._manifest = manifest
+            if remote['size'] is None:
+                self._futures = [self._executor.submit(self._fetch_whole)]
+            else:
+                self._pending = deque(index for index in range(self._segment_count())
+                                      if str(index) not in manifest['segments'])
+                self._update_progress()
+                self._futures = [self._executor.submit(self._fetch_segments)
+                                 for _ in range(min(self.concurrency, len(self._pending)))]
+            self._save_manifest()
+        return self
+    
+    def result(self) -> Path:
+        """Wait for the download to finish, returning the path of the file.
+        
+        Raises:
+            requests.RequestException: If a segment could not be downloaded
+            BRREGRequestError: If the server answered a segment incorrectly
+        """
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._shutdown()
+        return self.path
+    
+    def cancel(self) -> None:
+        """Stop fetching; completed segments stay recorded for the next run."""
+        self._cancelled.set()
+        # Idle workers stop without an error, so record one for streaming readers
+        if self._manifest and not self._manifest.get('complete'):
+            self._fail(BRREGRequestError(self.url, "download cancelled"))
+        self._shutdown()
+    
+    def remove(self) -> None:
+        """Delete the downloaded file and its manifest."""
+        for path in (self.manifest_path, self.path):
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+    
+    def _shutdown(self) -> None:
+        """Let the download's threads exit once their current request ends."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+    
+    def _fetch_segments(self) -> None:
+        """Fetch pending segments, lowest offset first, until none are left."""
+        while True:
+            try:
+                with self._lock:
+                    if not self._pending or self._manifest['error'] or self._cancelled.is_set():
+                        return
+                    index = self._pending.popleft()
+                crc = self._fetch_segment(index)
+                with self._lock:
+                    self._manifest['segments'][str(index)] = crc
+                    self._update_progress()
+                    self._save_manifest()
+            except Exception as e:
+                self._fail(e)
+                raise
+    
+    def _fetch_segment(self, index: int) -> int:
+        """Download one segment into place with retries, returning its CRC32."""
+        start = index * self.segment_size
+        length = self._segment_length(self._manifest, index)
+        headers = dict(self._headers, Range=f'bytes={start}-{start + length - 1}')
+        policy = self.client.retry_policy
+        
+        for attempt in range(1, policy.max_attempts + 1):
+            try:
+                with self.client.session.get(self.url, headers=headers, stream=True,
+                                             timeout=BULK_DOWNLOAD_TIMEOUT) as response:
+                    if response.status_code != 206:
+                        raise BRREGRequestError(self.url, f"HTTP {response.status_code} for segment {index}",
+                                                response.status_code)
+                    crc, written = self._write(response, start)
+                if written != length:
+                    raise BRREGRequestError(self.url, f"segment {index} ended after {written} of {length} bytes")
+                return crc
+            except (requests.RequestException, BRREGRequestError) as e:
+                status = getattr(e, 'status', None)
+                retryable = status is None or status >= 500 or status == 429
+                if not retryable or attempt == policy.max_attempts or self._cancelled.is_set():
+                    raise
+                print(f"⚠️  Segment {index} of {self.path.name} failed, retrying: {e}")
+                time.sleep(policy.backoff(attempt))
+    
+    def _fetch_whole(self) -> None:
+        """Download the file in one stream, for servers that ignore Range requests."""
+        try:
+            with self.client.session.get(self.url, headers=self._headers, stream=True,
+                                         timeout=BULK_DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                _, written = self._write(response, 0, report_progress=True)
+            with self._lock:
+                self._manifest.update(size=written, prefix=written, complete=True)
+                self._save_manifest()
+        except Exception as e:
+            self._fail(e)
+            raise
+    
+    def _write(self, response: requests.Response, offset: int, report_progress: bool = False) -> Tuple[int, int]:
+        """Write a response body into the file at ``offset``, returning (CRC32, bytes written)."""
+        crc = 0
+        written = 0
+        with open(self.path, 'r+b') as file:
+            file.seek(offset)
+            # Raw bytes: the body is the gzip file itself, not an encoded transfer
+            for chunk in response.raw.stream(DOWNLOAD_CHUNK_SIZE, decode_content=False):
+                if self._cancelled.is_set():
+                    raise BRREGRequestError(self.url, "download cancelled")
+                file.write(chunk)
+                crc = zlib.crc32(chunk, crc)
+                written += len(chunk)
+                with self._lock:
+                    self.downloaded_bytes += len(chunk)
+                    if report_progress:
+                        file.flush()
+                        self._manifest['prefix'] = written
+                        self._save_manifest()
+        return crc, written
+    
+    def _fail(self, error: Exception) -> None:
+        """Record a failure in the manifest, so streaming readers stop waiting.
+        
+        If the manifest cannot be written either (e.g. the disk is full),
+        readers notice the download has stalled after BULK_DOWNLOAD_TIMEOUT.
+        """
+        with self._lock:
+            if self._manifest.get('error'):
+                return  # Keep the first failure; later ones follow from it
+            self._manifest['error'] = getattr(error, 'reason', None) or str(error)
+            try:
+                self._save_manifest()
+            except OSError as e:
+                print(f"⚠️  Could not record the failure of {self.path.name}: {e}")
+    
+    def _segment_count(self) -> int:
+        return math.ceil(self._manifest['size'] / self.segment_size)
+    
+    def _segment_length(self, manifest: Dict[str, Any], index: int) -> int:
+        return min(self.segment_size, manifest['size'] - index * self.segment_size)
+    
+    def _update_progress(self) -> None:
+        """Recompute the completed prefix and completion from the recorded segments."""
+        segments = self._manifest['segments']
+        contiguous = 0
+        while str(contiguous) in segments:
+            contiguous += 1
+        self._manifest['prefix'] = min(contiguous * self.segment_size, self._manifest['size'])
+        self._manifest['complete'] = len(segments) == self._segment_count()
+    
+    def _verified_segments(self, manifest: Dict[str, Any]) -> Dict[str, int]:
+        """Recorded segments whose bytes in the file still match their CRC32."""
+        verified = {}
+        try:
+            with open(self.path, 'rb') as file:
+                for index, crc in manifest['segments'].items():
+                    file.seek(int(index) * self.segment_size)
+                    if zlib.crc32(file.read(self._segment_length(manifest, int(index)))) == crc:
+                        verified[index] = crc
+        except FileNotFoundError:
+            return {}
+        return verified
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    def _save_manifest(self) -> None:
+        """Replace the manifest atomically, so readers never see a partial one."""
+        temporary = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        temporary.write_text(json.dumps(self._manifest))
+        os.replace(temporary, self.manifest_path)
+
+
+class _BulkFilePrefix(io.RawIOBase):
+    """Readable view of a bulk file that blocks until its download has written the next bytes."""
+    
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        self._manifest_path = path.with_name(path.name + BulkDownload.MANIFEST_SUFFIX)
+        self._url = str(path)
+        self._position = 0
+        self._available = 0
+        self._complete = False
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._activity: Optional[Tuple] = None
+        self._active_at = time.monotonic()
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while self._position >= self._available:
+            if self._complete:
+                return 0
+            available = self._available
+            self._refresh()
+            if self._available == available and not self._complete:
+                self._check_stalled()
+                time.sleep(DOWNLOAD_POLL_INTERVAL)
+        
+        data = self._file.read(min(len(buffer), self._available - self._position))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+    
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+    
+    def _refresh(self) -> None:
+        """Read the completed prefix from the manifest; without one, the file is complete."""
+        try:
+            manifest = json.loads(self._manifest_path.read_text())
+        except FileNotFoundError:
+            self._available = os.fstat(self._file.fileno()).st_size
+            self._complete = True
+            return
+        self._manifest = manifest
+        self._url = manifest.get('url', self._url)
+        if manifest.get('error'):
+            raise BRREGRequestError(self._url, manifest['error'])
+        self._available = manifest['prefix']
+        self._complete = manifest['complete']
+    
+    def _check_stalled(self) -> None:
+        """Give up once neither the manifest nor the file has changed for BULK_DOWNLOAD_TIMEOUT.
+        
+        Covers downloads that stopped without recording an error, e.g. a
+        killed process or a manifest that could no longer be written.
+        """
+        activity = (self._manifest, os.fstat(self._file.fileno()).st_mtime_ns)
+        now = time.monotonic()
+        if activity != self._activity:
+            self._activity = activity
+            self._active_at = now
+        elif now - self._active_at > BULK_DOWNLOAD_TIMEOUT:
+            raise BRREGRequestError(self._url, f"download made no progress for {BULK_DOWNLOAD_TIMEOUT} seconds")
+
+
+@contextlib.contextmanager
+def open_bulk_file(path: Union[str, Path]) -> Iterator[BinaryIO]:
+    """Open a downloaded gzipped bulk file as a stream of JSON bytes.
+    
+    While a ``BulkDownload`` of the file is running, the stream follows its
+    completed prefix, waiting for new data instead of ending. gzip checks
+    the file's CRC32 and length when the stream reaches its end.
+    
+    Raises:
+        BRREGRequestError: If the download fails while being streamed
+    """
+    with _BulkFilePrefix(Path(path)) as raw, gzip.GzipFile(fileobj=raw) as stream:
+        yield stream
+
+
+def read_bulk_file(path: Union[str, Path]) -> Iterator[Dict]:
+    """Stream the records of a downloaded (or downloading) gzipped bulk file."""
+    with open_bulk_file(path) as stream:
+        yield from iter_json_array(stream)
+
+
+@contextlib.contextmanager
+def open_bulk_download(endpoint: str, base_url: str = BRREG_BASE_URL) -> Iterator[BinaryIO]:
+    """Open an endpoint's gzipped bulk download (totalbestand) as a stream of JSON bytes.
+    
+    The response is decompressed as it is read, without being held in
+    memory or written to disk.
+    
+    Raises:
+        requests.RequestException: If the download fails
+    """
+    headers = dict(BaseBRREGClient.HEADERS, Accept=BULK_DOWNLOAD_ACCEPT[endpoint])
+    with requests.get(f"{base_url}/{endpoint}/lastned", headers=headers, stream=True,
+                      timeout=BULK_DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        yield gzip.GzipFile(fileobj=response.raw)
+
+
+def download_bulk(endpoint: str, base_url: str = BRREG_BASE_URL) -> Iterator[Dict]:
+    """Stream the records of an endpoint's gzipped bulk download (totalbestand).
+    
+    Raises:
+        requests.RequestException: If the download fails
+    """
+    with open_bulk_download(endpoint, base_url) as stream:
+        yield from iter_json_array(stream)
+
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = BULK_READ_CHUNK_SIZE,
+                    max_element_size: int = MAX_BULK_ELEMENT_SIZE) -> Iterator[Dict]:
+    """Yield the elements of a JSON array read incrementally from a UTF-8 byte stream.
+    
+    Elements are decoded one at a time with the standard library's C
+    scanner, so memory use is bounded by the chunk size plus the largest
+    element, however large the array (like the multi-gigabyte bulk downloads).
+    
+    Args:
+        stream: Byte stream positioned at the array, e.g. a ``gzip.GzipFile``
+        chunk_size: Characters decoded per read
+        max_element_size: Largest element accepted, in characters
+        
+    Raises:
+        ValueError: If the stream is not a JSON array or ends before the array
+            does, or an element exceeds ``max_element_size`` (the input is
+            malformed)
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    buffer = ''
+    position = 0
+    read_size = chunk_size
+    opened = False
+    
+    while True:
+        chunk = text.read(read_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        
+        while True:
+            # Skip separators and whitespace between elements
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                break
+            if not opened:
+                if buffer[position] != '[':
+                    raise ValueError("Stream does not start with a JSON array")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # Element continues in the next chunk
+            if end == len(buffer) and chunk:
+                break  # A number cut at the end of the buffer may continue in the next chunk
+            position = end
+            yield element
+        
+        if not chunk:
+            raise ValueError("JSON array ended unexpectedly")
+        pending = len(buffer) - position
+        if pending > max_element_size:
+            raise ValueError(f"JSON array element exceeds {max_element_size:,} characters")
+        # A partial element is decoded again from its start, so read at least as much
+        # as is pending; elements spanning many chunks then cost linear, not quadratic, time
+        read_size = max(chunk_size, pending)
+
+
+# Start of a JSON array up to the first key of its first element
+_BULK_ARRAY_OPENING = re.compile(rb'\s*\[\s*(\{\s*"(?:[^"\\]|\\.)*"\s*:)')
+
+# A JSON array with no elements, with any whitespace
+_EMPTY_JSON_ARRAY = re.compile(rb'\s*\[\s*\]\s*')
+
+
+def _read_bulk_batches(opener: BulkOpener, batches: "multiprocessing.Queue", rows: "multiprocessing.Queue",
+                       workers: int) -> None:
+    """Reader stage of the ingestion pipeline: cut a bulk JSON array into batches of elements.
+    
+    Elements are not decoded here. The opening of the first element (up to
+    its first key) is taken as the pattern every element starts with, and
+    batches are cut before its last occurrence in each chunk. Workers decode
+    every batch in full, so a cut that was not at an element boundary fails
+    the build instead of corrupting the mirror.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The writer stops the pipeline on Ctrl-C
+    try:
+        with opener() as stream:
+            buffer = stream.read(BULK_READ_CHUNK_SIZE)
+            opening = _BULK_ARRAY_OPENING.match(buffer)
+            if opening is None:
+                if not _EMPTY_JSON_ARRAY.fullmatch(buffer):
+                    raise ValueError("Bulk data is not a JSON array of objects")
+            else:
+                element_start = opening.group(1)
+                buffer = buffer[opening.start(1):]
+                while True:
+                    chunk = stream.read(BULK_READ_CHUNK_SIZE)
+                    buffer += chunk
+                    if not chunk:
+                        break
+                    cut = buffer.rfind(element_start, 1)
+                    if cut > 0:
+                        batches.put(buffer[:cut].rstrip().rstrip(b','))
+                        buffer = buffer[cut:]
+                
+                buffer = buffer.rstrip()
+                if not buffer.endswith(b']'):
+                    raise ValueError("JSON array ended unexpectedly")
+                batches.put(buffer[:-1])
+    except Exception as e:
+        rows.put(BRREGIngestError(f"Reading the bulk data failed: {e}"))
+        return
+    
+    for _ in range(workers):
+        batches.put(None)
+
+
+def _decode_bulk_batches(endpoint: str, batches: "multiprocessing.Queue", rows: "multiprocessing.Queue") -> None:
+    """Worker stage of the ingestion pipeline: decode batches of elements into mirror rows."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The writer stops the pipeline on Ctrl-C
+    decode = JSON_DECODERS[DEFAULT_JSON_DECODER]
+    try:
+        batch = batches.get()
+        while batch is not None:
+            rows.put([LocalMirror._row(endpoint, record) for record in decode(b'[' + batch + b']')
+                      if record.get('organisasjonsnummer')])
+            batch = batches.get()
+    except Exception as e:
+        rows.put(BRREGIngestError(f"Decoding the bulk data failed: {e}"))
+        return
+    rows.put(None)
+
+
+def _time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until a ``time.monotonic()`` deadline (never negative), or None without one."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def _deadline_for(time_budget: Optional[float]) -> Optional[float]:
+    """Turn a time budget in seconds into a ``time.monotonic()`` deadline."""
+    return None if time_budget is None else time.monotonic() + time_budget
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delay in seconds or HTTP date) into seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter:
+    """
+    Client-wide token bucket with AIMD rate and concurrency adjustment.
+    
+    Requests take a token (refilled at ``current_rate`` per second) and a
+    concurrency slot before they are sent. Successful responses increase the
+    rate and concurrency limit additively; a 429 halves both and pauses all
+    requests until its Retry-After has passed. Over time the limiter settles
+    on the highest throughput the API sustains without throttling.
+    """
+    
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, min_rate: float = DEFAULT_MIN_RATE_LIMIT,
+                 max_rate: float = DEFAULT_MAX_RATE_LIMIT, max_concurrency: int = DEFAULT_POOL_MAXSIZE,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the limiter.
+        
+        Args:
+            rate: Initial requests per second
+            min_rate: Lower bound for the rate after decreases
+            max_rate: Upper bound for the rate after increases
+            max_concurrency: Upper bound for requests in flight at once
+            clock: Monotonic time source, in seconds
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self._rate = rate
+        self._concurrency = float(max_concurrency)
+        self._tokens = 1.0
+        self._refilled_at = clock()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._clock = clock
+        self._condition = threading.Condition()
+    
+    @property
+    def current_rate(self) -> float:
+        """Current allowed requests per second."""
+        with self._condition:
+            return self._rate
+    
+    @property
+    def concurrency_limit(self) -> int:
+        """Current maximum number of requests in flight."""
+        with self._condition:
+            return int(self._concurrency)
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a token or a concurrency slot."""
+        with self._condition:
+            return self._waiting
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently sent and not yet answered."""
+        with self._condition:
+            return self._in_flight
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a request may be sent.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            True once the request may be sent, False if the timeout passed first
+        """
+        give_up_at = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    
+                    wait = self._blocked_until - now
+                    if wait <= 0 and self._in_flight >= int(self._concurrency):
+                        wait = None  # Until a slot is released
+                    elif wait <= 0 and self._tokens < 1:
+                        wait = (1 - self._tokens) / self._rate
+                    elif wait <= 0:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        return True
+                    
+                    if give_up_at is not None:
+                        # Checked only now, so a request that may go at once is never turned away
+                        if now >= give_up_at:
+                            return False
+                        wait = give_up_at - now if wait is None else min(wait, give_up_at - now)
+                    self._condition.wait(wait)
+            finally:
+                self._waiting -= 1
+    
+    def release(self, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """Return a concurrency slot and adapt to the response.
+        
+        Args:
+            status: HTTP status code of the response, or None if the request failed
+            retry_after: Seconds the server asked to wait (429 responses)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            
+            if status == 429:
+                self._rate = max(self.min_rate, self._rate * RATE_DECREASE_FACTOR)
+                self._concurrency = max(1.0, self._concurrency * RATE_DECREASE_FACTOR)
+                pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+                self._blocked_until = max(self._blocked_until, self._clock() + pause)
+                self._tokens = 0.0
+            elif status is not None:
+                # Spread one step over a "round" of requests at the current rate and concurrency
+                self._rate = min(self.max_rate, self._rate + RATE_INCREASE_STEP / self._rate)
+                self._concurrency = min(float(self.max_concurrency),
+                                        self._concurrency + RATE_INCREASE_STEP / self._concurrency)
+            
+            self._condition.notify_all()
+    
+    def _refill(self, now: float) -> None:
+        # Allow a burst of up to one second's worth of requests
+        self._tokens = min(max(self._rate, 1.0), self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+
+class LatencyTracker:
+    """
+    Thread-safe rolling window of response times for one API endpoint.
+    
+    Only the most recent ``window`` samples are kept, so percentiles follow
+    brownouts and recoveries instead of averaging over the whole run.
+    """
+    
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_LATENCY_SAMPLES):
+        """Initialize an empty tracker.
+        
+        Args:
+            window: Number of recent samples kept
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.min_samples = min_samples
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+    
+    def record(self, seconds: float) -> None:
+        """Add a response time, in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the given percentile of the window (nearest rank), or None without enough samples."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for one API endpoint.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail fast for ``reset_timeout`` seconds. The circuit then turns
+    half-open and lets a single trial request through: success closes it,
+    failure opens it again. Every state change is passed to the listeners
+    as a CircuitEvent.
+    """
+    
+    def __init__(self, endpoint: str, failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_CIRCUIT_RESET_TIMEOUT,
+                 listeners: Iterable[Callable[[CircuitEvent], None]] = (),
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize a closed circuit.
+        
+        Args:
+            endpoint: Name of the endpoint the circuit protects
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+            listeners: Callables receiving every CircuitEvent
+            clock: Monotonic time source, in seconds
+        """
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.listeners = list(listeners)
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> CircuitState:
+        """Current state of the circuit."""
+        with self._lock:
+            return self._state
+    
+    @property
+    def retry_in(self) -> float:
+        """Seconds until an open circuit allows a trial request (0 if not open)."""
+        with self._lock:
+            if self._state != CircuitState.OPEN:
+                return 0.0
+            return max(self._opened_at + self.reset_timeout - self._clock(), 0.0)
+    
+    def allow(self) -> bool:
+        """Return whether a request may be sent now."""
+        with self._lock:
+            event = None
+            if self._state == CircuitState.OPEN and self._clock() >= self._opened_at + self.reset_timeout:
+                event = self._transition(CircuitState.HALF_OPEN)
+            
+            if self._state == CircuitState.CLOSED:
+                allowed = True
+            elif self._state == CircuitState.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                allowed = True
+            else:
+                allowed = False
+        
+        self._emit(event)
+        return allowed
+    
+    def record_success(self) -> None:
+        """Record a request that reached a healthy endpoint."""
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            event = self._transition(CircuitState.CLOSED) if self._state != CircuitState.CLOSED else None
+        self._emit(event)
+    
+    def record_abandoned(self) -> None:
+        """Record a request cut short by its caller, which says nothing about the endpoint."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit when the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            event = None
+            if self._state == CircuitState.HALF_OPEN or (
+                    self._state == CircuitState.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                event = self._transition(CircuitState.OPEN)
+        self._emit(event)
+    
+    def _transition(self, state: CircuitState) -> CircuitEvent:
+        """Change state; the caller holds the lock and emits the returned event."""
+        event = CircuitEvent(self.endpoint, self._state, state, self._failures)
+        self._state = state
+        return event
+    
+    def _emit(self, event: Optional[CircuitEvent]) -> None:
+        """Pass an event to the listeners, outside the lock."""
+        if event is None:
+            return
+        for listener in self.listeners:
+            listener(event)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How transient failures (network errors, timeouts, 5xx and 429) are retried."""
+    max_attempts: int = DEFAULT_RETRY_ATTEMPTS
+    base_delay: float = DEFAULT_RETRY_BASE_DELAY
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY
+    deadline: float = DEFAULT_RETRY_DEADLINE
+    
+    def backoff(self, retry: int) -> float:
+        """Exponential backoff with full jitter for the given retry (1 for the first retry)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+
+@dataclass
+class RetryBudgetStats:
+    """Counters describing retry budget usage."""
+    requests: int = 0
+    retries: int = 0
+    denied: int = 0
+
+
+class RetryBudget:
+    """
+    Client-wide limit on retries as a fraction of requests sent.
+    
+    Every request deposits ``ratio`` tokens and every retry spends one, so
+    during an outage retries cannot exceed roughly ``ratio`` of the traffic
+    and retry storms cannot amplify it. Savings are capped at ``reserve``
+    tokens, which are also available up front; a long run of healthy
+    traffic therefore cannot bank retries for the next outage.
+    """
+    
+    def __init__(self, ratio: float = DEFAULT_RETRY_BUDGET_RATIO, reserve: int = DEFAULT_RETRY_BUDGET_RESERVE):
+        """Initialize the budget.
+        
+        Args:
+            ratio: Retries allowed per request sent
+            reserve: Retries available up front, and the most that can be saved up
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = float(reserve)
+        self._stats = RetryBudgetStats()
+        self._lock = threading.Lock()
+    
+    @property
+    def stats(self) -> RetryBudgetStats:
+        """Snapshot of the request, retry and denied-retry counters."""
+        with self._lock:
+            return RetryBudgetStats(**vars(self._stats))
+    
+    def record_request(self) -> None:
+        """Account for a request sent for the first time."""
+        with self._lock:
+            self._stats.requests += 1
+            self._tokens = min(float(self.reserve), self._tokens + self.ratio)
+    
+    def try_spend(self) -> bool:
+        """Take one retry from the budget, returning False if it is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                self._stats.denied += 1
+                return False
+            self._tokens -= 1
+            self._stats.retries += 1
+            return True
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single execution.
+    
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and share its result or exception instead of
+    repeating the work.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._coalesced = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def coalesced(self) -> int:
+        """Number of calls that were answered by another caller's execution."""
+        with self._lock:
+            return self._coalesced
+    
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Run ``function`` for ``key``, or wait for the execution already in flight.
+        
+        Args:
+            key: Identifies calls that would produce the same result
+            function: Zero-argument callable doing the actual work
+            
+        Returns:
+            The function's result, shared by all coalesced callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self._coalesced += 1
+        
+        if not leader:
+            return call.result()
+        
+        try:
+            result = function()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class BaseBRREGClient:
+    """Shared configuration and response parsing for the BRREG API clients."""
+    
+    HEADERS = {
+        'User-Agent': 'BRREG-Lookup-Tool/2.0.0',
+        'Accept': 'application/json'
+    }
+    
+    # Searchable endpoints in merge order, with their entity type and display label
+    ENDPOINTS = {
+        "enheter": (EntityType.HOVEDENHET, "main entities"),
+        "underenheter": (EntityType.UNDERENHET, "sub-entities"),
+    }
+    
+    def __init__(self, base_url: str = BRREG_BASE_URL, timeout: int = REQUEST_TIMEOUT,
+                 json_decoder: Union[str, JSONDecoder] = DEFAULT_JSON_DECODER):
+        """Initialize the shared client configuration.
+        
+        Args:
+            base_url: Base URL for the BRREG API
+            timeout: Request timeout in seconds
+            json_decoder: Name of a decoder in JSON_DECODERS, or a callable
+                decoding a JSON document from bytes
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        if isinstance(json_decoder, str):
+            if json_decoder not in JSON_DECODERS:
+                raise ValueError(f"Unknown JSON decoder '{json_decoder}' "
+                                 f"(available: {', '.join(JSON_DECODERS)})")
+            json_decoder = JSON_DECODERS[json_decoder]
+        self.json_decoder = json_decoder
+    
+    def _decode_json(self, body: bytes) -> Any:
+        """Decode a response body straight from bytes with the configured decoder.
+        
+        Raises:
+            requests.exceptions.InvalidJSONError: If the body is not valid JSON
+        """
+        try:
+            return self.json_decoder(body)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f"Invalid JSON in response: {e}") from e
+    
+    @staticmethod
+    def _batch_candidates(org_numbers: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split batch input into the requested numbers and the unique, well-formed ones to query.
+        
+        Malformed numbers are never sent, since a single bad value fails the whole batch request.
+        """
+        requested = [org_number.strip() for org_number in org_numbers]
+        pending = list(dict.fromkeys(nr for nr in requested if InputValidator.validate_org_number(nr)))
+        return requested, pending
+    
+    @staticmethod
+    def _search_params(endpoint: str, name: str, filters: Optional[SearchFilters] = None) -> Dict[str, str]:
+        """Build the query parameters for a name search, including any filters."""
+        params = {'navn': name}
+        if filters:
+            params.update(filters.to_params(endpoint))
+        return params
+    
+    @staticmethod
+    def _sort_by_relevance(results: List[OrganizationInfo]) -> None:
+        """Sort by relevance score (highest first), then by entity type preference."""
+        results.sort(key=lambda x: (x.relevance_score, x.entity_type == EntityType.HOVEDENHET), reverse=True)
+    
+    def _parse_organization_data(self, data: Dict, entity_type: EntityType, query: Optional[str] = None) -> Optional[OrganizationInfo]:
+        """Parse raw API data into OrganizationInfo object."""
+        try:
+            # Extract basic information
+            name = data.get('navn', 'Navn ikke tilgjengelig')
+            org_number = data.get('organisasjonsnummer', 'N/A')
+            
+            # Calculate relevance score if query is provided
+            relevance_score = 0.0
+            if query:
+                relevance_score = TextMatcher.calculate_relevance_score(query, name)
+            
+            # Parse addresses
+            business_address = self._parse_address(data.get('forretningsadresse'))
+            postal_address = self._parse_address(data.get('postadresse'))
+            
+            # Extract additional information
+            org_form = None
+            if data.get('organisasjonsform'):
+                org_form = data['organisasjonsform'].get('beskrivelse')
+            
+            industry_code = None
+            if data.get('naeringskode1'):
+                industry_code = data['naeringskode1'].get('beskrivelse')
+            
+            return OrganizationInfo(
+                name=name,
+                org_number=org_number,
+                entity_type=entity_type,
+                business_address=business_address,
+                postal_address=postal_address,
+                organization_form=org_form,
+                industry_code=industry_code,
+                relevance_score=relevance_score
+            )
+        except Exception as e:
+            print(f"⚠️  Error parsing organization data: {e}")
+            return None
+    
+    def _parse_address(self, address_data: Optional[Dict]) -> Optional[Address]:
+        """Parse address data from API response."""
+        if not address_data:
+            return None
+        
+        street_lines = address_data.get('adresse', [])
+        postal_code = address_data.get('postnummer')
+        city = address_data.get('poststed')
+        
+        return Address(
+            street_lines=street_lines or [],
+            postal_code=postal_code,
+            city=city
+        )
+
+
+class BRREGClient(BaseBRREGClient):
+    """Professional client for interacting with the BRREG API.
+    
+    The client is thread-safe: a single instance can be shared across worker
+    threads. Each thread gets its own ``requests.Session`` (which is not safe
+    to share), and each session keeps its connections alive for reuse.
+    """
+    
+    def __init__(self, base_url: str = BRREG_BASE_URL, timeout: int = REQUEST_TIMEOUT,
+                 probe_mode: ProbeMode = ProbeMode.SEQUENTIAL, hedge_delay: float = DEFAULT_HEDGE_DELAY,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 cache: Optional[LookupCache] = None, response_cache: Optional["ResponseCache"] = None,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 retry_budget: Optional[RetryBudget] = None,
+                 circuit_failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 circuit_reset_timeout: float = DEFAULT_CIRCUIT_RESET_TIMEOUT,
+                 on_circuit_change: Optional[Callable[[CircuitEvent], None]] = None,
+                 adaptive_timeout: bool = True, timeout_multiplier: float = DEFAULT_TIMEOUT_MULTIPLIER,
+                 hedge_requests: bool = False, warm_connections: int = 0,
+                 json_decoder: Union[str, JSONDecoder] = DEFAULT_JSON_DECODER,
+                 mirror: Optional[LocalMirror] = None):
+        """Initialize the BRREG client.
+        
+        Args:
+            base_url: Base URL for the BRREG API
+            timeout: Request timeout in seconds, used until an endpoint has
+                enough latency samples (or always, without adaptive_timeout)
+            probe_mode: How lookup_by_number probes main entities and sub-entities
+            hedge_delay: Seconds to wait for the main entity probe before
+                starting the sub-entity probe in hedged mode
+            pool_connections: Number of per-host connection pools kept by each session
+            pool_maxsize: Maximum number of keep-alive connections per host and session
+            cache: Cache for number lookups; a default LookupCache is created
+                if omitted (pass ``LookupCache(max_size=0)`` to disable caching)
+            response_cache: Optional persistent cache of raw responses, shared
+                across processes and runs
+            rate_limiter: Optional client-wide limiter pacing all requests
+            retry_policy: How transient failures are retried (defaults to RetryPolicy())
+            retry_budget: Client-wide cap on retries (defaults to RetryBudget())
+            circuit_failure_threshold: Consecutive failures that open an endpoint's circuit
+            circuit_reset_timeout: Seconds an open circuit fails fast before a trial request
+            on_circuit_change: Optional callable receiving every CircuitEvent
+            adaptive_timeout: Derive each endpoint's timeout from its recent p99 latency
+            timeout_multiplier: Adaptive timeout as a multiple of the p99 latency
+            hedge_requests: Send a duplicate request when no response has
+                arrived once the endpoint's p95 latency has elapsed
+            warm_connections: Keep-alive connections to open in the background
+                for the constructing thread (0 disables warming); ``warmup``
+                holds the resulting ConnectionTimings
+            json_decoder: Name of a decoder in JSON_DECODERS, or a callable
+                decoding bytes (defaults to orjson when installed)
+            mirror: Built LocalMirror answering number lookups and unfiltered
+                name searches without the network
+        """
+        super().__init__(base_url, timeout, json_decoder)
+        if mirror is not None and not mirror.is_built:
+            raise ValueError(f"Mirror in {mirror.directory} has not been built yet")
+        self.mirror = mirror
+        self.probe_mode = probe_mode
+        self.hedge_delay = hedge_delay
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.cache = cache if cache is not None else LookupCache()
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_timeout = circuit_reset_timeout
+        self._circuit_listeners: List[Callable[[CircuitEvent], None]] = [self._report_circuit_change]
+        if on_circuit_change is not None:
+            self._circuit_listeners.append(on_circuit_change)
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._endpoint_lock = threading.Lock()
+        self.adaptive_timeout = adaptive_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge_requests = hedge_requests
+        self._latency_trackers: Dict[str, LatencyTracker] = {}
+        self._hedge_stats = HedgeStats()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._connection_stats = ConnectionStats()
+        self._revalidation_stats = RevalidationStats()
+        self._single_flight = SingleFlight()
+        self._refreshing: Set[str] = set()
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+        self._sessions_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._organization_form_codes: Dict[str, List[str]] = {}
+        
+        self.warmup: Optional["Future[List[ConnectionTimings]]"] = None
+        if warm_connections > 0:
+            # Warm the constructing thread's session; the pool does the work
+            self.warmup = self.executor.submit(self._warm_session, self.session, warm_connections)
+    
+    def __enter__(self) -> "BRREGClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Release the worker threads and HTTP connections held by the client."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+        with self._sessions_lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+    
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session owned by the calling thread, created on first use."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._create_session()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.add(session)
+        return session
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Lazily created worker pool used for concurrent requests."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="brreg")
+            return self._executor
+    
+    @property
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        """Lazily created pool for hedged requests.
+        
+        Separate from ``executor``, whose tasks may themselves be waiting on
+        requests, so hedging can never starve the pool it is called from.
+        """
+        with self._executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS * 2,
+                                                          thread_name_prefix="brreg-hedge")
+            return self._hedge_executor
+    
+    @property
+    def hedge_stats(self) -> HedgeStats:
+        """Snapshot of how many requests were hedged and how many hedges answered first."""
+        with self._stats_lock:
+            return HedgeStats(**vars(self._hedge_stats))
+    
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """Snapshot of request latency split by whether a connection had to be opened."""
+        with self._stats_lock:
+            return ConnectionStats(**vars(self._connection_stats))
+    
+    def warm(self, connections: int = DEFAULT_WARM_CONNECTIONS) -> List[ConnectionTimings]:
+        """Open keep-alive connections to the API ahead of the first request.
+        
+        Connections are added to the calling thread's session, so warm from
+        the thread that will send the requests. Warming is best effort:
+        failures are reported and the remaining connections are skipped.
+        
+        Args:
+            connections: Number of connections to open (at most pool_maxsize)
+            
+        Returns:
+            DNS, TCP connect and TLS handshake times of each opened connection
+        """
+        return self._warm_session(self.session, connections)
+    
+    def _warm_session(self, session: requests.Session, connections: int) -> List[ConnectionTimings]:
+        """Open connections in a session's pool for the API host, timing each phase."""
+        pool = self._connection_pool(session)
+        held = []
+        timings = []
+        try:
+            # Hold every connection taken, so each _get_conn() yields a different one
+            for _ in range(min(connections, self.pool_maxsize)):
+                conn = pool._get_conn()
+                held.append(conn)
+                if conn.sock is None:
+                    timings.append(self._open_connection(conn, pool.host, pool.port))
+        except (OSError, urllib3.exceptions.HTTPError) as e:
+            print(f"⚠️  Connection warm-up failed: {e}")
+        finally:
+            for conn in held:
+                pool._put_conn(conn)
+        
+        with self._stats_lock:
+            self._connection_stats.warmed_connections += len(timings)
+        return timings
+    
+    def _open_connection(self, conn: urllib3.connection.HTTPConnection, host: str, port: int) -> ConnectionTimings:
+        """Connect a pooled connection, timing DNS, TCP connect and TLS handshake separately."""
+        start = time.perf_counter()
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        dns = time.perf_counter() - start
+        
+        # connect() performs the TCP connect in _new_conn() and then the TLS
+        # handshake; timing _new_conn() separates the two. Connecting to the
+        # resolved address avoids paying DNS twice, while TLS still verifies
+        # the host name.
+        tcp = 0.0
+        new_conn = conn._new_conn
+        
+        def timed_new_conn() -> socket.socket:
+            nonlocal tcp
+            begin = time.perf_counter()
+            try:
+                return new_conn()
+            finally:
+                tcp = time.perf_counter() - begin
+        
+        conn._dns_host = address
+        conn._new_conn = timed_new_conn
+        conn.timeout = self.timeout
+        try:
+            start = time.perf_counter()
+            conn.connect()
+            elapsed = time.perf_counter() - start
+        finally:
+            del conn._new_conn
+        
+        return ConnectionTimings(dns, tcp, max(elapsed - tcp, 0.0))
+    
+    def _connection_pool(self, session: requests.Session) -> urllib3.HTTPConnectionPool:
+        """The pool the session sends API requests through (pools are keyed by TLS settings too)."""
+        adapter = session.get_adapter(self.base_url)
+        # Resolve CA bundle and proxies from the environment, as Session.request does
+        settings = session.merge_environment_settings(self.base_url, {}, None, None, None)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = requests.Request("GET", self.base_url).prepare()
+            return adapter.get_connection_with_tls_context(request, settings['verify'],
+                                                           settings['proxies'], settings['cert'])
+        return adapter.get_connection(self.base_url, settings['proxies'])
+    
+    @property
+    def revalidation_stats(self) -> RevalidationStats:
+        """Snapshot of the requests and work saved by conditional revalidation."""
+        with self._stats_lock:
+            return RevalidationStats(**vars(self._revalidation_stats))
+    
+    @property
+    def coalesced_calls(self) -> int:
+        """Number of lookups and searches answered by an identical call already in flight."""
+        return self._single_flight.coalesced
+    
+    def circuit_breaker(self, endpoint: str) -> CircuitBreaker:
+        """Circuit breaker for an endpoint such as ``enheter``, created on first use."""
+        with self._endpoint_lock:
+            breaker = self._circuit_breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, self.circuit_failure_threshold,
+                                         self.circuit_reset_timeout, self._circuit_listeners)
+                self._circuit_breakers[endpoint] = breaker
+            return breaker
+    
+    def latency_tracker(self, endpoint: str) -> LatencyTracker:
+        """Rolling latency window for an endpoint such as ``enheter``, created on first use."""
+        with self._endpoint_lock:
+            tracker = self._latency_trackers.get(endpoint)
+            if tracker is None:
+                tracker = self._latency_trackers[endpoint] = LatencyTracker()
+            return tracker
+    
+    def request_timeout(self, endpoint: str) -> float:
+        """Timeout for the next request to an endpoint.
+        
+        With adaptive timeouts this is the endpoint's recent p99 latency times
+        ``timeout_multiplier``, clamped to MIN/MAX_ADAPTIVE_TIMEOUT, so it
+        tightens when the API is fast and loosens during a brownout.
+        """
+        p99 = self.latency_tracker(endpoint).percentile(TIMEOUT_PERCENTILE) if self.adaptive_timeout else None
+        if p99 is None:
+            return self.timeout
+        return min(max(p99 * self.timeout_multiplier, MIN_ADAPTIVE_TIMEOUT), MAX_ADAPTIVE_TIMEOUT)
+    
+    @staticmethod
+    def _report_circuit_change(event: CircuitEvent) -> None:
+        """Print circuit state changes."""
+        if event.state == CircuitState.OPEN:
+            print(f"⚡ Circuit for /{event.endpoint} opened after {event.failures} failure(s)")
+        elif event.state == CircuitState.HALF_OPEN:
+            print(f"⚡ Circuit for /{event.endpoint} half-open, sending a trial request")
+        else:
+            print(f"✅ Circuit for /{event.endpoint} closed")
+    
+    def _endpoint_of(self, url: str) -> str:
+        """Name of the API endpoint a URL belongs to, e.g. ``underenheter``."""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else urlsplit(url).path
+        return path.strip('/').split('/')[0]
+    
+    def _get_json(self, url: str, params: Optional[Dict] = None, validators: Optional[Validators] = None,
+                  deadline: Optional[float] = None) -> _ApiResponse:
+        """GET a URL, served from the persistent response cache when possible.
+        
+        Expired cached responses are revalidated with a conditional request;
+        a 304 renews the cached copy instead of downloading it again. While
+        the endpoint's circuit is open, an expired cached copy is served
+        instead of failing.
+        
+        Args:
+            url: URL to fetch
+            params: Query parameters
+            validators: Validators of a copy the caller already holds; when the
+                server reports it unchanged, a 304 response is returned
+            deadline: ``time.monotonic()`` time by which the call must finish
+            
+        Returns:
+            Response status, decoded JSON body (200 only), validators and body size
+            
+        Raises:
+            requests.RequestException: If the response body is not valid JSON
+            BRREGRequestError: If the request still fails after retrying
+        """
+        cache_key = None
+        stored = None
+        if self.response_cache is not None:
+            cache_key = ResponseCache.make_key(url, params)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                data = self._decode_json(cached.body) if cached.status == 200 else None
+                return _ApiResponse(cached.status, data, cached.validators, len(cached.body))
+            stored = self.response_cache.get_expired(cache_key)
+        
+        conditional = validators or (stored.validators if stored else None)
+        headers = conditional.to_headers() if conditional else None
+        
+        try:
+            response = self._send(url, params, headers, deadline)
+        except BRREGCircuitOpenError:
+            if stored is None and cache_key is not None:
+                stored = self.response_cache.get_expired(cache_key, require_validators=False)
+            if stored is None:
+                raise
+            print(f"⚡ Serving expired cached response for {url}")
+            data = self._decode_json(stored.body) if stored.status == 200 else None
+            return _ApiResponse(stored.status, data, stored.validators, len(stored.body))
+        received = Validators.from_headers(response.headers)
+        
+        if conditional:
+            with self._stats_lock:
+                self._revalidation_stats.revalidations += 1
+        
+        if response.status_code == 304:
+            if stored is not None:
+                self.response_cache.renew(cache_key, received)
+            if validators is None and stored is not None:
+                # Serve the stored body; only the download was saved
+                with self._stats_lock:
+                    self._revalidation_stats.not_modified += 1
+                    self._revalidation_stats.bytes_saved += len(stored.body)
+                return _ApiResponse(200, self._decode_json(stored.body), received or stored.validators,
+                                    len(stored.body))
+            return _ApiResponse(304, None, received or validators)
+        
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response.status_code, response.content, received)
+        
+        data = self._decode_json(response.content) if response.status_code == 200 else None
+        return _ApiResponse(response.status_code, data, received, len(response.content))
+    
+    def _send(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+              deadline: Optional[float] = None) -> requests.Response:
+        """Send a GET request, retrying transient failures according to the retry policy.
+        
+        Network errors (any ``requests.RequestException`` except
+        NON_RETRYABLE_REQUEST_ERRORS, so also connection errors, timeouts and
+        bodies cut off mid-transfer), 5xx and 429 responses are retried with
+        full-jitter exponential backoff (429s wait for their Retry-After),
+        as long as the retry policy's deadline, the caller's ``deadline`` and the
+        client-wide retry budget allow. Each attempt passes through the
+        endpoint's circuit breaker, and no attempt runs past ``deadline``.
+        
+        Raises:
+            BRREGDeadlineExceeded: If ``deadline`` passes before a response arrives
+            BRREGCircuitOpenError: If the endpoint's circuit is open
+            BRREGThrottledError: If the API still throttles when retrying stops
+            BRREGRequestError: If the request still fails when retrying stops
+            requests.RequestException: If the request itself is malformed
+                (one of NON_RETRYABLE_REQUEST_ERRORS, e.g. an invalid URL)
+        """
+        policy = self.retry_policy
+        endpoint = self._endpoint_of(url)
+        breaker = self.circuit_breaker(endpoint)
+        error = None
+        stop_at = time.monotonic() + policy.deadline
+        if deadline is not None:
+            stop_at = min(stop_at, deadline)
+        self.retry_budget.record_request()
+        
+        for attempt in range(1, max(policy.max_attempts, 1) + 1):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise BRREGDeadlineExceeded(url) from error
+            if not breaker.allow():
+                raise BRREGCircuitOpenError(url, breaker.endpoint, breaker.retry_in) from error
+            
+            response = None
+            error = None
+            retry_after = None
+            
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(_time_left(deadline)):
+                # Nothing was sent, so release a half-open trial for the next request
+                breaker.record_abandoned()
+                raise BRREGDeadlineExceeded(url)
+            endpoint_timeout = self.request_timeout(endpoint)
+            timeout = max(min(endpoint_timeout, stop_at - time.monotonic()), 0.001)
+            # A timeout shortened to fit the caller's deadline is not a sign of a slow endpoint
+            clipped = timeout < endpoint_timeout
+            try:
+                response = self._request(endpoint, url, params, headers, timeout, clipped)
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except requests.RequestException as e:
+                error = e
+            finally:
+                status = response.status_code if response is not None else None
+                if self.rate_limiter is not None:
+                    self.rate_limiter.release(status, retry_after)
+                # Throttling comes from a healthy endpoint and is left to the rate limiter
+                if status is not None and status < 500:
+                    breaker.record_success()
+                elif clipped and isinstance(error, requests.Timeout):
+                    breaker.record_abandoned()
+                elif isinstance(error, NON_RETRYABLE_REQUEST_ERRORS):
+                    # Says nothing about the endpoint's health
+                    breaker.record_abandoned()
+                else:
+                    breaker.record_failure()
+            
+            if isinstance(error, NON_RETRYABLE_REQUEST_ERRORS):
+                raise error
+            
+            if status is not None and status != 429 and status < 500:
+                return response
+            
+            if breaker.state == CircuitState.OPEN:
+                # This failure opened the circuit; retrying would only fail fast
+                raise BRREGCircuitOpenError(url, breaker.endpoint, breaker.retry_in) from error
+            
+            reason = f"HTTP {status}" if status is not None else type(error).__name__
+            delay = retry_after if retry_after is not None else policy.backoff(attempt)
+            if attempt >= policy.max_attempts:
+                break
+            if time.monotonic() + delay > stop_at:
+                if stop_at == deadline:
+                    raise BRREGDeadlineExceeded(url) from error
+                break
+            if not self.retry_budget.try_spend():
+                break
+            
+            print(f"⏳ {reason} from BRREG, retrying in {delay:.1f}s")
+            if status != 429 or self.rate_limiter is None:
+                # The rate limiter already holds back requests until Retry-After has passed
+                time.sleep(delay)
+        
+        if status == 429:
+            raise BRREGThrottledError(url, retry_after)
+        raise BRREGRequestError(url, reason, status) from error
+    
+    def _request(self, endpoint: str, url: str, params: Optional[Dict], headers: Optional[Dict],
+                 timeout: float, clipped: bool = False) -> requests.Response:
+        """Send one attempt of a request, hedged when enabled.
+        
+        With ``hedge_requests``, a duplicate is sent once the endpoint's p95
+        latency has passed without a response, and whichever answers first wins.
+        """
+        hedge_after = self.latency_tracker(endpoint).percentile(HEDGE_PERCENTILE) if self.hedge_requests else None
+        if hedge_after is None:
+            return self._timed_get(endpoint, url, params, headers, timeout, clipped)
+        
+        primary = self.hedge_executor.submit(self._timed_get, endpoint, url, params, headers, timeout, clipped)
+        try:
+            return primary.result(timeout=hedge_after)
+        except FuturesTimeoutError:
+            pass
+        
+        hedge = self.hedge_executor.submit(self._hedged_get, endpoint, url, params, headers,
+                                           max(timeout - hedge_after, 0.001), clipped)
+        with self._stats_lock:
+            self._hedge_stats.hedged += 1
+        
+        for future in as_completed([primary, hedge]):
+            if future.exception() is None:
+                if future is hedge:
+                    with self._stats_lock:
+                        self._hedge_stats.hedge_wins += 1
+                return future.result()
+        return primary.result()
+    
+    def _hedged_get(self, endpoint: str, url: str, params: Optional[Dict], headers: Optional[Dict],
+                    timeout: float, clipped: bool) -> requests.Response:
+        """Send a hedge duplicate, paced by the rate limiter like any other request."""
+        response = None
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout):
+            raise BRREGDeadlineExceeded(url)
+        try:
+            response = self._timed_get(endpoint, url, params, headers, timeout, clipped)
+            return response
+        finally:
+            if self.rate_limiter is not None:
+                retry_after = None
+                if response is not None and response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.release(response.status_code if response is not None else None, retry_after)
+    
+    def _timed_get(self, endpoint: str, url: str, params: Optional[Dict], headers: Optional[Dict],
+                   timeout: float, clipped: bool = False) -> requests.Response:
+        """GET on the calling thread's session, recording the latency of healthy responses."""
+        tracker = self.latency_tracker(endpoint)
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = self._connection_pool(self.session)
+        opened = pool.num_connections
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        except requests.Timeout:
+            # A timed-out request took at least this long; recording it keeps
+            # the adaptive timeout from ratcheting down during a brownout
+            if not clipped:
+                tracker.record(timeout)
+            raise
+        if response.status_code < 500:
+            elapsed = time.monotonic() - start
+            tracker.record(elapsed)
+            with self._stats_lock:
+                if pool.num_connections > opened:
+                    self._connection_stats.cold_requests += 1
+                    self._connection_stats.cold_seconds += elapsed
+                else:
+                    self._connection_stats.warm_requests += 1
+                    self._connection_stats.warm_seconds += elapsed
+        return response
+    
+    def _create_session(self) -> requests.Session:
+        """Create a session with the configured keep-alive connection pool."""
+        session = requests.Session()
+        session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def lookup_by_number(self, org_number: str, probe_mode: Optional[ProbeMode] = None,
+                         time_budget: Optional[float] = None) -> Optional[OrganizationInfo]:
+        """Lookup organization by organization number.
+        
+        Main entities always take precedence over sub-entities, regardless
+        of the probe mode or which response arrives first. With a mirror,
+        the lookup is answered from it without the network.
+        
+        Args:
+            org_number: 9-digit organization number
+            probe_mode: Override the client's probe mode for this call
+            time_budget: Maximum seconds the whole lookup may take, shared by
+                all of its requests
+            
+        Returns:
+            OrganizationInfo if found, None otherwise
+            
+        Raises:
+            BRREGDeadlineExceeded: If the time budget runs out first
+        """
+        if self.mirror is not None:
+            return self._lookup_mirror(org_number)
+        
+        deadline = _deadline_for(time_budget)
+        hit, org_info = self.cache.get(org_number)
+        if hit:
+            return org_info
+        
+        # Within the stale window, answer now and refresh in the background
+        org_info = self.cache.get_stale(org_number)
+        if org_info:
+            self._refresh_in_background(org_number)
+            return org_info
+        
+        mode = probe_mode or self.probe_mode
+        if deadline is not None:
+            # Not coalesced: callers sharing the lookup would inherit this caller's deadline
+            return self._fetch_organization(org_number, mode, deadline)
+        # Concurrent lookups of the same number share a single round of requests
+        return self._single_flight.do(("lookup", org_number), lambda: self._fetch_organization(org_number, mode))
+    
+    def lookup_many(self, org_numbers: Iterable[str],
+                    time_budget: Optional[float] = None) -> ResultList:
+        """Lookup many organizations using batched multi-value queries.
+        
+        Organization numbers are packed into comma-separated
+        ``organisasjonsnummer`` queries against the main entity endpoint,
+        and only the numbers not found there are queried against the
+        sub-entity endpoint. With a mirror, every number is looked up in it.
+        
+        Args:
+            org_numbers: Organization numbers to look up
+            time_budget: Maximum seconds the whole call may take
+            
+        Returns:
+            ResultList of (org_number, OrganizationInfo or None) pairs in
+            input order, rather than a mapping, so duplicates keep their
+            place and the list can carry ``partial``; ``dict()`` on the
+            result gives the mapping by number. Malformed numbers are never
+            sent (one bad value fails a whole batch request) and map to None.
+            If the time budget ran out, ``partial`` is True and numbers that
+            were not reached map to None.
+        """
+        deadline = _deadline_for(time_budget)
+        requested, pending = self._batch_candidates(org_numbers)
+        if self.mirror is not None:
+            return ResultList((nr, self._lookup_mirror(nr)) for nr in requested)
+
+        results: Dict[str, Optional[OrganizationInfo]] = {}
+        
+        for nr in pending:
+            hit, org_info = self.cache.get(nr)
+            if hit:
+                results[nr] = org_info
+        pending = [nr for nr in pending if nr not in results]
+        partial = False
+        
+        if pending:
+            print(f"🔍 Batch checking {len(pending)} number(s) in main entities")
+            found, main_confirmed, complete = self._lookup_batch("enheter", pending, EntityType.HOVEDENHET, deadline)
+            
+            misses = [nr for nr in pending if nr not in found]
+            sub_confirmed: Set[str] = set()
+            if misses and complete:
+                print(f"🔍 Batch checking {len(misses)} number(s) in sub-entities")
+                sub_found, sub_confirmed, complete = self._lookup_batch("underenheter", misses,
+                                                                        EntityType.UNDERENHET, deadline)
+                found.update(sub_found)
+            partial = not complete
+            
+            for nr in pending:
+                results[nr] = found.get(nr)
+                if nr in found or (nr in main_confirmed and nr in sub_confirmed):
+                    self.cache.put(nr, results[nr])
+        
+        return ResultList(((nr, results.get(nr)) for nr in requested), partial=partial)
+    
+    def _lookup_mirror(self, org_number: str) -> Optional[OrganizationInfo]:
+        """Look up an organization in the local mirror."""
+        stored = self.mirror.get(org_number)
+        if stored is None:
+            return None
+        endpoint, body = stored
+        return self._parse_organization_data(self._decode_json(body), self.ENDPOINTS[endpoint][0])
+    
+    def sync_mirror(self, mirror: Optional[LocalMirror] = None) -> Dict[str, MirrorSyncStats]:
+        """Bring a local mirror up to date from the API's update feeds (oppdateringer).
+        
+        Each endpoint's feed is read from the change after the mirror's
+        checkpoint, or from a day before the build on the first sync. Every
+        page of changes is applied in one transaction that also advances the
+        checkpoint, so an interrupted sync resumes where it stopped. New and
+        changed organizations are re-fetched in batches; removed ones are
+        deleted.
+        
+        Args:
+            mirror: Mirror to update (default: the client's mirror)
+            
+        Returns:
+            Sync statistics by endpoint
+            
+        Raises:
+            ValueError: If there is no built mirror to sync
+            BRREGRequestError: If the API cannot be reached; pages applied so far are kept
+        """
+        mirror = mirror or self.mirror
+        if mirror is None or not mirror.is_built:
+            raise ValueError("sync_mirror() needs a built LocalMirror")
+        return {endpoint: self._sync_endpoint(mirror, endpoint) for endpoint in MIRROR_UPDATE_FEEDS}
+    
+    def _sync_endpoint(self, mirror: LocalMirror, endpoint: str) -> MirrorSyncStats:
+        """Apply an endpoint's update feed to the mirror, one page per transaction."""
+        stats = MirrorSyncStats(checkpoint=mirror.checkpoint(endpoint))
+        url = f"{self.base_url}/oppdateringer/{endpoint}"
+        
+        while True:
+            params: Dict[str, Any] = {'size': MIRROR_SYNC_PAGE_SIZE}
+            if stats.checkpoint is None:
+                since = datetime.fromisoformat(mirror.built_at) - MIRROR_SYNC_OVERLAP
+                params['dato'] = since.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            else:
+                params['oppdateringsid'] = stats.checkpoint + 1
+            
+            changes = self._get_fresh_json(url, params).get('_embedded', {}).get(MIRROR_UPDATE_FEEDS[endpoint], [])
+            if not changes:
+                return stats
+            
+            # Only the latest change of each organization matters
+            latest = {change['organisasjonsnummer']: change.get('endringstype') for change in changes}
+            deletions = {nr for nr, change_type in latest.items() if change_type in MIRROR_DELETION_TYPES}
+            documents = self._fetch_documents(endpoint, [nr for nr in latest if nr not in deletions])
+            # Organizations the API no longer returns were removed after the change
+            deletions.update(nr for nr in latest if nr not in documents)
+            
+            stats.checkpoint = max(change['oppdateringsid'] for change in changes)
+            mirror.apply_changes(endpoint, documents.values(), deletions, stats.checkpoint)
+            stats.changes += len(changes)
+            stats.updated += len(documents)
+            stats.deleted += len(deletions)
+            print(f"🔄 {endpoint}: {stats.changes:,} changes applied (oppdateringsid {stats.checkpoint})")
+            
+            if len(changes) < MIRROR_SYNC_PAGE_SIZE:
+                return stats
+    
+    def _fetch_documents(self, endpoint: str, org_numbers: List[str]) -> Dict[str, Dict]:
+        """Fetch the current documents of organizations in parallel batches, by number."""
+        url = f"{self.base_url}/{endpoint}"
+        chunks = [org_numbers[start:start + MAX_BATCH_LOOKUP_SIZE]
+                  for start in range(0, len(org_numbers), MAX_BATCH_LOOKUP_SIZE)]
+        pages = self.executor.map(
+            lambda chunk: self._get_fresh_json(url, {'organisasjonsnummer': ",".join(chunk), 'size': len(chunk)}),
+            chunks
+        )
+        return {item['organisasjonsnummer']: item
+                for page in pages for item in page.get('_embedded', {}).get(endpoint, [])}
+    
+    def _get_fresh_json(self, url: str, params: Dict) -> Dict:
+        """GET a URL bypassing the response cache, raising unless the response is a 200.
+        
+        Raises:
+            BRREGRequestError: If the request fails or is answered with another status
+        """
+        response = self._send(url, params)
+        if response.status_code != 200:
+            raise BRREGRequestError(url, f"HTTP {response.status_code}", response.status_code)
+        return self._decode_json(response.content)
+    
+    def download_bulk_file(self, endpoint: str, directory: Union[str, Path],
+                           concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY) -> BulkDownload:
+        """Start a resumable, segmented download of an endpoint's bulk file (totalbestand).
+        
+        Args:
+            endpoint: ``enheter`` or ``underenheter``
+            directory: Directory for the file (``<endpoint>.json.gz``) and its manifest
+            concurrency: Segments fetched at a time
+            
+        Returns:
+            The running download; ``result()`` waits for it to finish
+        """
+        url = f"{self.base_url}/{endpoint}/lastned"
+        path = Path(directory).expanduser() / f"{endpoint}.json.gz"
+        return BulkDownload(self, url, path, {'Accept': BULK_DOWNLOAD_ACCEPT[endpoint]},
+                            concurrency=concurrency).start()
+    
+    def _fetch_organization(self, org_number: str, mode: ProbeMode,
+                            deadline: Optional[float] = None) -> Optional[OrganizationInfo]:
+        """Revalidate or look up an organization that is not fresh in the cache.
+        
+        While a circuit is open, an expired cached copy is served instead of failing.
+        """
+        try:
+            org_info = self._revalidate(org_number, deadline)
+            if org_info:
+                return org_info
+            
+            org_info, confirmed = self._lookup_uncached(org_number, mode, deadline)
+        except BRREGCircuitOpenError:
+            expired = self.cache.get_expired(org_number)
+            if expired is None:
+                raise
+            print(f"⚡ Serving expired cached copy of {org_number}")
+            return expired[0]
+        
+        # Found organizations are cached by the probe, together with their validators.
+        # Misses are only cached when both registers answered that the number does not exist.
+        if org_info is None and confirmed:
+            self.cache.put(org_number, None)
+        
+        return org_info
+    
+    def _refresh_in_background(self, org_number: str) -> None:
+        """Refresh a stale cache entry on the worker pool, at most once at a time per number."""
+        with self._refresh_lock:
+            if org_number in self._refreshing:
+                return
+            self._refreshing.add(org_number)
+        
+        def refresh() -> None:
+            try:
+                # Sequential probing, so the refresh never waits on the pool it runs in
+                self._single_flight.do(("lookup", org_number),
+                                       lambda: self._fetch_organization(org_number, ProbeMode.SEQUENTIAL))
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(org_number)
+        
+        self.executor.submit(refresh)
+    
+    def _revalidate(self, org_number: str, deadline: Optional[float] = None) -> Optional[OrganizationInfo]:
+        """Revalidate an expired cached organization with a conditional request.
+        
+        A 304 renews the cached entry without decoding or parsing anything.
+        
+        Returns:
+            The current OrganizationInfo, or None if there was nothing to
+            revalidate or the organization must be looked up again
+        """
+        expired = self.cache.get_expired(org_number)
+        if expired is None:
+            return None
+        
+        org_info, validators, size = expired
+        endpoint = "enheter" if org_info.entity_type == EntityType.HOVEDENHET else "underenheter"
+        url = f"{self.base_url}/{endpoint}/{org_number}"
+        print(f"🔍 Revalidating cached {self.ENDPOINTS[endpoint][1]}: {url}")
+        
+        try:
+            response = self._get_json(url, validators=validators, deadline=deadline)
+        except requests.RequestException as e:
+            print(f"⚠️  Error revalidating {org_number}: {e}")
+            return None
+        
+        if response.status == 304:
+            self.cache.renew(org_number, response.validators)
+            with self._stats_lock:
+                self._revalidation_stats.not_modified += 1
+                self._revalidation_stats.bytes_saved += size
+                self._revalidation_stats.parse_calls_saved += 1
+            return org_info
+        
+        if response.status == 200:
+            fresh = self._parse_organization_data(response.data, org_info.entity_type)
+            if fresh:
+                self.cache.put(org_number, fresh, response.validators, response.size)
+            return fresh
+        
+        # Gone from this register; a full lookup decides where it lives now
+        self.cache.invalidate(org_number)
+        return None
+    
+    def _lookup_uncached(self, org_number: str, mode: ProbeMode,
+                         deadline: Optional[float] = None) -> Tuple[Optional[OrganizationInfo], bool]:
+        """Probe main entities and sub-entities according to the probe mode.
+        
+        Returns:
+            Tuple of (OrganizationInfo or None, confirmed), where confirmed is
+            False if a probe failed and a miss may therefore not be real
+            
+        Raises:
+            BRREGDeadlineExceeded: If the deadline passes before the probes answer
+        """
+        if mode == ProbeMode.SEQUENTIAL:
+            # Try main entities first, then sub-entities if not found in main
+            main_result, main_confirmed = self._probe_entity("enheter", org_number, EntityType.HOVEDENHET, deadline)
+            if main_result:
+                return main_result, True
+            sub_result, sub_confirmed = self._probe_entity("underenheter", org_number,
+                                                           EntityType.UNDERENHET, deadline)
+            return sub_result, main_confirmed and sub_confirmed
+        
+        main_future = self.executor.submit(self._probe_entity, "enheter", org_number,
+                                           EntityType.HOVEDENHET, deadline)
+        
+        if mode == ProbeMode.HEDGED:
+            hedge_delay = self.hedge_delay if deadline is None else min(self.hedge_delay, _time_left(deadline))
+            try:
+                main_result, main_confirmed = main_future.result(timeout=hedge_delay)
+            except FuturesTimeoutError:
+                pass
+            else:
+                # Main probe answered within the hedge delay; no need to hedge
+                if main_result:
+                    return main_result, True
+                sub_result, sub_confirmed = self._probe_entity("underenheter", org_number,
+                                                               EntityType.UNDERENHET, deadline)
+                return sub_result, main_confirmed and sub_confirmed
+        
+        sub_future = self.executor.submit(self._probe_entity, "underenheter", org_number,
+                                          EntityType.UNDERENHET, deadline)
+        
+        try:
+            main_result, main_confirmed = main_future.result(timeout=_time_left(deadline))
+            if main_result:
+                # Sub-entity probe is cancelled if still queued, otherwise its result is ignored
+                sub_future.cancel()
+                return main_result, True
+            
+            sub_result, sub_confirmed = sub_future.result(timeout=_time_left(deadline))
+        except FuturesTimeoutError:
+            # A probe still waiting for a worker thread
+            sub_future.cancel()
+            raise BRREGDeadlineExceeded(f"{self.base_url}/enheter/{org_number}") from None
+        return sub_result, main_confirmed and sub_confirmed
+    
+    def _probe_entity(self, endpoint: str, org_number: str, entity_type: EntityType,
+                      deadline: Optional[float] = None) -> Tuple[Optional[OrganizationInfo], bool]:
+        """Fetch a single organization from the given endpoint.
+        
+        Returns:
+            Tuple of (OrganizationInfo or None, confirmed), where confirmed is
+            True when the endpoint gave a definite answer (200 or 404)
+        """
+        url = f"{self.base_url}/{endpoint}/{org_number}"
+        label = self.ENDPOINTS[endpoint][1]
+        print(f"🔍 Checking {label}: {url}")
+        
+        try:
+            response = self._get_json(url, deadline=deadline)
+            if response.status == 200:
+                org_info = self._parse_organization_data(response.data, entity_type)
+                if org_info:
+                    self.cache.put(org_number, org_info, response.validators, response.size)
+                return org_info, org_info is not None
+            return None, response.status == 404
+        except requests.RequestException as e:
+            print(f"⚠️  Error checking {label}: {e}")
+        
+        return None, False
+    
+    def search_by_name(self, name: str, filters: Optional[SearchFilters] = None,
+                       time_budget: Optional[float] = None) -> ResultList:
+        """Search organizations by name with intelligent relevance ranking.
+        
+        With a mirror, searches without filters are answered from it;
+        filtered searches still go to the API.
+        
+        Args:
+            name: Organization name to search for
+            filters: Server-side filters narrowing the search
+            time_budget: Maximum seconds the whole search may take
+            
+        Returns:
+            ResultList of matching OrganizationInfo objects sorted by
+            relevance; ``partial`` is True if the time budget ran out before
+            both endpoints answered
+            
+        Raises:
+            BRREGRequestError: If an endpoint still fails after retrying
         """
-        query_clean = TextMatcher._normalize_text(query)
-        name_clean = TextMatcher._normalize_text(organization_name)
+        if self.mirror is not None and filters is None:
+            return self._search_mirror(name)
         
-        # Exact match gets highest score
-        if query_clean == name_clean:
-            return 1.0
+        if time_budget is not None:
+            # Not coalesced: callers sharing the search would inherit this caller's partial result
+            return self._search_uncached(name, filters, _deadline_for(time_budget))
+        # Concurrent identical searches share one set of requests; each caller gets its own list
+        shared = self._single_flight.do(("search", name, filters), lambda: self._search_uncached(name, filters))
+        return ResultList(shared, partial=shared.partial)
+    
+    def _search_mirror(self, name: str) -> ResultList:
+        """Search the local mirror, scoring and sorting like an API search."""
+        results = ResultList()
+        for endpoint, (entity_type, label) in self.ENDPOINTS.items():
+            for body in self.mirror.search(name, endpoint):
+                org_info = self._parse_organization_data(self._decode_json(body), entity_type, name)
+                if org_info:
+                    results.append(org_info)
+        self._sort_by_relevance(results)
+        return results
+    
+    def _search_uncached(self, name: str, filters: Optional[SearchFilters],
+                         deadline: Optional[float] = None) -> ResultList:
+        """Search both endpoints concurrently and merge the scored results."""
+        # Query both endpoints at once and score each page as soon as it arrives
+        futures = {}
+        for endpoint, (entity_type, label) in self.ENDPOINTS.items():
+            print(f"🔍 Searching {label} for: '{name}'")
+            futures[self.executor.submit(self._search_endpoint, endpoint, name, filters, deadline)] = endpoint
         
-        # Check if query is contained in name (case insensitive)
-        if query_clean in name_clean:
-            return 0.95
+        scored: Dict[str, List[OrganizationInfo]] = {endpoint: [] for endpoint in self.ENDPOINTS}
+        partial = False
+        try:
+            for future in as_completed(futures, timeout=_time_left(deadline)):
+                endpoint = futures[future]
+                entity_type = self.ENDPOINTS[endpoint][0]
+                try:
+                    items = future.result()
+                except BRREGDeadlineExceeded:
+                    partial = True
+                    continue
+                for data in items:
+                    org_info = self._parse_organization_data(data, entity_type, name)
+                    if org_info:
+                        scored[endpoint].append(org_info)
+        except FuturesTimeoutError:
+            # An endpoint search still waiting for a worker thread
+            partial = True
+            for future in futures:
+                future.cancel()
         
-        # Check if name contains query
-        if name_clean in query_clean:
-            return 0.9
+        if partial:
+            print("⚠️  Time budget ran out; search results may be incomplete")
         
-        # Use sequence matcher for fuzzy matching
-        similarity = SequenceMatcher(None, query_clean, name_clean).ratio()
+        # Merge in endpoint order so ties keep a stable, arrival-independent order
+        results = ResultList((org_info for endpoint in self.ENDPOINTS for org_info in scored[endpoint]), partial)
+        self._sort_by_relevance(results)
         
-        # Boost score if all words in query appear in name
-        query_words = set(query_clean.split())
-        name_words = set(name_clean.split())
+        return results
+    
+    def iter_search(self, name: str, endpoint: str = "enheter", page_size: int = SEARCH_PAGE_SIZE,
+                    max_concurrent_pages: int = 1, filters: Optional[SearchFilters] = None,
+                    time_budget: Optional[float] = None) -> Iterator[OrganizationInfo]:
+        """Iterate over every search result of an endpoint, page by page.
         
-        if query_words.issubset(name_words):
-            similarity += WORD_SUBSET_BONUS  # Boost for containing all words
+        Unlike search_by_name, this is not capped at MAX_SEARCH_RESULTS. The
+        next page is always fetched in the background while the current page
+        is parsed and scored. Results are yielded in API order, not sorted.
         
-        # Boost score for word order preservation
-        if TextMatcher._preserves_word_order(query_clean, name_clean):
-            similarity += WORD_ORDER_BONUS
+        Args:
+            name: Organization name to search for
+            endpoint: Endpoint to search ("enheter" or "underenheter")
+            page_size: Number of results requested per page
+            max_concurrent_pages: Pages kept in flight at once once the total
+                page count is known (1 means plain prefetch of the next page)
+            filters: Server-side filters narrowing the search
+            time_budget: Maximum seconds for the whole iteration, including
+                time spent by the consumer between results
+            
+        Yields:
+            OrganizationInfo objects scored against the query
+            
+        Raises:
+            BRREGDeadlineExceeded: When the time budget runs out; results
+                already yielded remain valid
+            BRREGRequestError: When a page cannot be fetched, instead of
+                silently skipping its results
+        """
+        entity_type = self.ENDPOINTS[endpoint][0]
+        deadline = _deadline_for(time_budget)
         
-        return min(similarity, 1.0)  # Cap at 1.0
+        params = self._search_params(endpoint, name, filters)
+        
+        for items in self._iter_search_pages(endpoint, params, page_size, max_concurrent_pages, deadline):
+            for data in items:
+                org_info = self._parse_organization_data(data, entity_type, name)
+                if org_info:
+                    yield org_info
     
-    @staticmethod
-    def _normalize_text(text: str) -> str:
-        """
-        Normalize text for comparison by converting to lowercase and stripping whitespace.
+    def search_exhaustive(self, name: str, endpoint: Optional[str] = None, page_size: int = SEARCH_PAGE_SIZE,
+                          filters: Optional[SearchFilters] = None,
+                          time_budget: Optional[float] = None) -> ResultList:
+        """Retrieve every search result, even beyond the API's paging window.
+        
+        Searches with more than MAX_RESULT_WINDOW results are split into
+        disjoint sub-queries (shards), first by halving the registration
+        date range and then, for single days, by organization form, until
+        each shard fits in the window. All shard pages are fetched in
+        parallel and merged.
         
         Args:
-            text: Text to normalize
+            name: Organization name to search for
+            endpoint: Endpoint to search, or None for both endpoints
+            page_size: Number of results requested per page
+            filters: Server-side filters narrowing the search
+            time_budget: Maximum seconds the whole search may take
             
         Returns:
-            Normalized text string
+            ResultList of unique OrganizationInfo objects sorted by relevance;
+            ``partial`` is True if the time budget ran out first, a shard
+            count or page could not be fetched, or a shard that could not be
+            split further was truncated to MAX_RESULT_WINDOW results
         """
-        return text.lower().strip()
+        deadline = _deadline_for(time_budget)
+        endpoints = [endpoint] if endpoint else list(self.ENDPOINTS)
+        results = ResultList()
+        seen = set()
+        timed_out = False
+        
+        for endpoint in endpoints:
+            entity_type, label = self.ENDPOINTS[endpoint]
+            print(f"🔍 Planning exhaustive search of {label} for: '{name}'")
+            try:
+                shards, complete = self._plan_shards(endpoint, self._search_params(endpoint, name, filters),
+                                                     deadline)
+            except BRREGDeadlineExceeded:
+                timed_out = True
+                break
+            if not complete:
+                results.partial = True
+            
+            futures = [
+                self.executor.submit(self._fetch_search_page, endpoint, shard, page, page_size, deadline)
+                for shard, count in shards
+                for page in range(math.ceil(min(count, MAX_RESULT_WINDOW) / page_size))
+            ]
+            print(f"🔍 Fetching {len(futures)} page(s) across {len(shards)} shard(s)")
+            
+            try:
+                # Consume in submission order so the merged result is deterministic
+                for future in futures:
+                    try:
+                        data = future.result(timeout=_time_left(deadline))
+                    except (BRREGDeadlineExceeded, FuturesTimeoutError):
+                        timed_out = True
+                        break
+                    except BRREGError as e:
+                        print(f"⚠️  {e}")
+                        data = None
+                    if data is None:
+                        # The page's results are missing from the merge
+                        results.partial = True
+                        continue
+                    for item in data.get('_embedded', {}).get(endpoint, []):
+                        org_info = self._parse_organization_data(item, entity_type, name)
+                        if org_info and org_info.org_number not in seen:
+                            seen.add(org_info.org_number)
+                            results.append(org_info)
+            finally:
+                # Pages not yet started are dropped once the search stops early
+                for future in futures:
+                    future.cancel()
+            
+            if timed_out:
+                break
+        
+        if timed_out:
+            results.partial = True
+            print("⚠️  Time budget ran out; search results may be incomplete")
+        elif results.partial:
+            print("⚠️  Some shards could not be fetched in full; search results are incomplete")
+        
+        self._sort_by_relevance(results)
+        return results
     
-    @staticmethod
-    def _preserves_word_order(query: str, name: str) -> bool:
+    def _search_endpoint(self, endpoint: str, name: str, filters: Optional[SearchFilters] = None,
+                         deadline: Optional[float] = None) -> List[Dict]:
+        """Search a specific endpoint for organizations by name."""
+        params = self._search_params(endpoint, name, filters)
+        data = self._fetch_search_page(endpoint, params, 0, MAX_SEARCH_RESULTS, deadline)
+        return data.get('_embedded', {}).get(endpoint, []) if data else []
+    
+    def _fetch_search_page(self, endpoint: str, params: Dict, page: int, page_size: int,
+                           deadline: Optional[float] = None) -> Optional[Dict]:
+        """Fetch one page of search results, returning the full response body.
+        
+        Returns:
+            The decoded page, or None if the API answered with another status
+            than 200 or with invalid JSON
+            
+        Raises:
+            BRREGRequestError: If the request still fails after retrying (5xx,
+                429, network errors or an open circuit); callers that can
+                return partial results catch it
         """
-        Check if the word order from query is preserved in the organization name.
+        try:
+            url = f"{self.base_url}/{endpoint}"
+            page_params = dict(params, page=page, size=page_size)
+            
+            response = self._get_json(url, page_params, deadline=deadline)
+            if response.status == 200:
+                return response.data
+        except requests.RequestException as e:
+            print(f"⚠️  Error searching {endpoint}: {e}")
         
-        This method checks if all words from the query appear in the same order
-        within the organization name, which indicates a more relevant match.
+        return None
+    
+    def _count_results(self, endpoint: str, params: Dict, deadline: Optional[float] = None) -> Optional[int]:
+        """Return the total number of results for a query, or None if it fails.
         
-        Args:
-            query: The search query
-            name: The organization name
+        Raises:
+            BRREGDeadlineExceeded: If ``deadline`` passes before the count arrives
+        """
+        try:
+            data = self._fetch_search_page(endpoint, params, 0, 1, deadline)
+        except BRREGDeadlineExceeded:
+            raise
+        except BRREGError as e:
+            print(f"⚠️  {e}")
+            return None
+        return data.get('page', {}).get('totalElements', 0) if data is not None else None
+    
+    def _plan_shards(self, endpoint: str, params: Dict,
+                     deadline: Optional[float] = None) -> Tuple[List[Tuple[Dict, int]], bool]:
+        """Split a query into disjoint shards that each fit in MAX_RESULT_WINDOW.
+        
+        Returns:
+            Tuple of (list of (shard query parameters, result count) pairs,
+            whether the shards cover every result: False if a shard could
+            not be counted or had to be truncated to MAX_RESULT_WINDOW)
+            
+        Raises:
+            BRREGDeadlineExceeded: If ``deadline`` passes while counting
+        """
+        total = self._count_results(endpoint, params, deadline)
+        if total is None:
+            return [], False
+        frontier = [(params, total)]
+        shards = []
+        complete = True
+        
+        while frontier:
+            oversized = []
+            for shard, count in frontier:
+                if count is None:
+                    print(f"⚠️  Shard {shard} could not be counted; its results are skipped")
+                    complete = False
+                elif count > MAX_RESULT_WINDOW:
+                    oversized.append(shard)
+                elif count:
+                    shards.append((shard, count))
+            
+            candidates = []
+            for shard in oversized:
+                parts = self._split_shard(endpoint, shard, deadline)
+                if parts:
+                    candidates.extend(parts)
+                else:
+                    print(f"⚠️  Shard {shard} cannot be split further; only {MAX_RESULT_WINDOW} results retrieved")
+                    shards.append((shard, MAX_RESULT_WINDOW))
+                    complete = False
+            
+            # Count each level of sub-queries in parallel
+            counts = self.executor.map(lambda shard: self._count_results(endpoint, shard, deadline), candidates,
+                                       timeout=_time_left(deadline))
+            try:
+                frontier = list(zip(candidates, counts))
+            except FuturesTimeoutError:
+                raise BRREGDeadlineExceeded(f"{self.base_url}/{endpoint}") from None
+        
+        covered = sum(count for _, count in shards)
+        if covered < total:
+            print(f"⚠️  Shards cover {covered} of {total} {endpoint} results")
+            complete = False
+        
+        return shards, complete
+    
+    def _split_shard(self, endpoint: str, params: Dict, deadline: Optional[float] = None) -> List[Dict]:
+        """Split a shard in two by registration date, or by organization form for a single day."""
+        start = date.fromisoformat(params.get(SHARD_FROM_DATE_PARAM, SHARD_START_DATE.isoformat()))
+        end = date.fromisoformat(params.get(SHARD_TO_DATE_PARAM, date.today().isoformat()))
+        
+        if start < end:
+            middle = start + (end - start) // 2
+            return [
+                dict(params, **{SHARD_FROM_DATE_PARAM: start.isoformat(), SHARD_TO_DATE_PARAM: middle.isoformat()}),
+                dict(params, **{SHARD_FROM_DATE_PARAM: (middle + timedelta(days=1)).isoformat(),
+                                SHARD_TO_DATE_PARAM: end.isoformat()}),
+            ]
+        
+        if 'organisasjonsform' not in params:
+            return [dict(params, organisasjonsform=code)
+                    for code in self._get_organization_form_codes(endpoint, deadline)]
+        
+        return []
+    
+    def _get_organization_form_codes(self, endpoint: str, deadline: Optional[float] = None) -> List[str]:
+        """Fetch (once) the organization form codes used by an endpoint."""
+        if endpoint in self._organization_form_codes:
+            return self._organization_form_codes[endpoint]
+        
+        codes = []
+        try:
+            response = self._get_json(f"{self.base_url}/organisasjonsformer/{endpoint}", deadline=deadline)
+            if response.status == 200:
+                forms = response.data.get('_embedded', {}).get('organisasjonsformer', [])
+                codes = [form['kode'] for form in forms if form.get('kode')]
+        except requests.RequestException as e:
+            print(f"⚠️  Error fetching organization forms: {e}")
+        
+        # Failed fetches are not remembered, so a later call can retry
+        if codes:
+            self._organization_form_codes[endpoint] = codes
+        return codes
+    
+    def _iter_search_pages(self, endpoint: str, params: Dict, page_size: int, max_concurrent_pages: int,
+                           deadline: Optional[float] = None) -> Iterator[List[Dict]]:
+        """Yield the result items of each page, keeping upcoming pages in flight."""
+        url = f"{self.base_url}/{endpoint}"
+        first = self._fetch_search_page(endpoint, params, 0, page_size, deadline)
+        if first is None:
+            raise BRREGRequestError(url, "search page 0 could not be fetched")
+        
+        total_pages = first.get('page', {}).get('totalPages', 1)
+        reachable_pages = MAX_RESULT_WINDOW // page_size
+        if total_pages > reachable_pages:
+            print(f"⚠️  Only the first {MAX_RESULT_WINDOW} of "
+                  f"{first['page'].get('totalElements')} {endpoint} results can be paged")
+            total_pages = reachable_pages
+        
+        in_flight = deque()
+        next_page = 1
+        
+        def schedule() -> None:
+            nonlocal next_page
+            while next_page < total_pages and len(in_flight) < max(max_concurrent_pages, 1):
+                in_flight.append((next_page, self.executor.submit(self._fetch_search_page, endpoint, params,
+                                                                  next_page, page_size, deadline)))
+                next_page += 1
+        
+        try:
+            schedule()
+            yield first.get('_embedded', {}).get(endpoint, [])
             
+            while in_flight:
+                page, future = in_flight.popleft()
+                try:
+                    data = future.result(timeout=_time_left(deadline))
+                except FuturesTimeoutError:
+                    raise BRREGDeadlineExceeded(url) from None
+                if data is None:
+                    # Skipping the page would silently drop its results
+                    raise BRREGRequestError(url, f"search page {page} could not be fetched")
+                schedule()
+                yield data.get('_embedded', {}).get(endpoint, [])
+        finally:
+            # Consumer stopped early; drop pages that have not started yet
+            for _, future in in_flight:
+                future.cancel()
+    
+    def _lookup_batch(self, endpoint: str, org_numbers: List[str], entity_type: EntityType,
+                      deadline: Optional[float] = None) -> Tuple[Dict[str, OrganizationInfo], Set[str], bool]:
+        """Fetch organizations from an endpoint in chunks of MAX_BATCH_LOOKUP_SIZE numbers.
+        
         Returns:
-            True if word order is preserved, False otherwise
+            Tuple of (organizations found by number, numbers whose chunk was
+            answered, whether every chunk was sent before the deadline)
         """
-        query_words = query.split()
-        name_words = name.split()
+        found: Dict[str, OrganizationInfo] = {}
+        confirmed: Set[str] = set()
+        url = f"{self.base_url}/{endpoint}"
         
-        query_index = 0
-        for word in name_words:
-            if query_index < len(query_words) and word == query_words[query_index]:
-                query_index += 1
+        for start in range(0, len(org_numbers), MAX_BATCH_LOOKUP_SIZE):
+            chunk = org_numbers[start:start + MAX_BATCH_LOOKUP_SIZE]
+            params = {'organisasjonsnummer': ",".join(chunk), 'size': len(chunk)}
+            
+            try:
+                response = self._get_json(url, params, deadline=deadline)
+                if response.status != 200:
+                    continue
+            except BRREGDeadlineExceeded:
+                print(f"⚠️  Time budget ran out while batch checking {endpoint}")
+                return found, confirmed, False
+            except requests.RequestException as e:
+                print(f"⚠️  Error batch checking {endpoint}: {e}")
+                continue
+            
+            confirmed.update(chunk)
+            for item in response.data.get('_embedded', {}).get(endpoint, []):
+                org_info = self._parse_organization_data(item, entity_type)
+                if org_info:
+                    found[org_info.org_number] = org_info
         
-        return query_index == len(query_words)
+        return found, confirmed, True
 
 
-class BRREGClient:
-    """Professional client for interacting with the BRREG API."""
+class AsyncBRREGClient(BaseBRREGClient):
+    """asyncio client for the BRREG API with bounded concurrency.
     
-    def __init__(self, base_url: str = BRREG_BASE_URL, timeout: int = REQUEST_TIMEOUT):
-        """Initialize the BRREG client.
+    Mirrors the BRREGClient lookup and search methods as coroutines, so
+    thousands of lookups can be in flight from a single event loop. At most
+    ``max_concurrency`` requests are sent at once. Requires the optional
+    ``aiohttp`` dependency.
+    
+    Example:
+        async with AsyncBRREGClient(max_concurrency=200) as client:
+            results = await client.lookup_many(org_numbers)
+    """
+    
+    def __init__(self, base_url: str = BRREG_BASE_URL, timeout: int = REQUEST_TIMEOUT,
+                 max_concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                 json_decoder: Union[str, JSONDecoder] = DEFAULT_JSON_DECODER):
+        """Initialize the async BRREG client.
         
         Args:
             base_url: Base URL for the BRREG API
             timeout: Request timeout in seconds
+            max_concurrency: Maximum number of requests in flight at once
+            json_decoder: Name of a decoder in JSON_DECODERS, or a callable
+                decoding bytes (defaults to orjson when installed)
         """
-        self.base_url = base_url
-        self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'BRREG-Lookup-Tool/2.0.0',
-            'Accept': 'application/json'
-        })
+        if aiohttp is None:
+            raise ImportError("AsyncBRREGClient requires aiohttp (pip install aiohttp)")
+        
+        super().__init__(base_url, timeout, json_decoder)
+        self.max_concurrency = max_concurrency
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> "AsyncBRREGClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
     
-    def lookup_by_number(self, org_number: str) -> Optional[OrganizationInfo]:
+    async def lookup_by_number(self, org_number: str) -> Optional[OrganizationInfo]:
         """Lookup organization by organization number.
         
         Args:
@@ -215,132 +3674,110 @@ class BRREGClient:
         Returns:
             OrganizationInfo if found, None otherwise
         """
-        # Try main entities first
-        main_url = f"{self.base_url}/enheter/{org_number}"
-        print(f"🔍 Checking main entities: {main_url}")
+        for endpoint, (entity_type, _) in self.ENDPOINTS.items():
+            data = await self._get_json(f"{self.base_url}/{endpoint}/{org_number}")
+            if data is not None:
+                return self._parse_organization_data(data, entity_type)
         
-        try:
-            response = self.session.get(main_url, timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_organization_data(data, EntityType.HOVEDENHET)
-        except requests.RequestException as e:
-            print(f"⚠️  Error checking main entities: {e}")
+        return None
+    
+    async def lookup_many(self, org_numbers: Iterable[str]) -> List[Tuple[str, Optional[OrganizationInfo]]]:
+        """Lookup many organizations using concurrent batched multi-value queries.
         
-        # Try sub-entities if not found in main
-        sub_url = f"{self.base_url}/underenheter/{org_number}"
-        print(f"🔍 Checking sub-entities: {sub_url}")
+        Args:
+            org_numbers: Organization numbers to look up
+            
+        Returns:
+            List of (org_number, OrganizationInfo or None) pairs in input
+            order, including duplicates
+        """
+        requested, pending = self._batch_candidates(org_numbers)
+        found: Dict[str, OrganizationInfo] = {}
         
-        try:
-            response = self.session.get(sub_url, timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_organization_data(data, EntityType.UNDERENHET)
-        except requests.RequestException as e:
-            print(f"⚠️  Error checking sub-entities: {e}")
+        found.update(await self._lookup_batch("enheter", pending, EntityType.HOVEDENHET))
+        misses = [nr for nr in pending if nr not in found]
+        if misses:
+            found.update(await self._lookup_batch("underenheter", misses, EntityType.UNDERENHET))
         
-        return None
+        return [(nr, found.get(nr)) for nr in requested]
     
-    def search_by_name(self, name: str) -> List[OrganizationInfo]:
+    async def search_by_name(self, name: str, filters: Optional[SearchFilters] = None) -> List[OrganizationInfo]:
         """Search organizations by name with intelligent relevance ranking.
         
         Args:
             name: Organization name to search for
+            filters: Server-side filters narrowing the search
             
         Returns:
             List of matching OrganizationInfo objects sorted by relevance
         """
-        results = []
+        pages = await asyncio.gather(*(self._search_endpoint(endpoint, name, filters) for endpoint in self.ENDPOINTS))
         
-        # Search main entities
-        print(f"🔍 Searching main entities for: '{name}'")
-        main_results = self._search_endpoint("enheter", name)
-        for data in main_results:
-            org_info = self._parse_organization_data(data, EntityType.HOVEDENHET, name)
-            if org_info:
-                results.append(org_info)
-        
-        # Search sub-entities
-        print(f"🔍 Searching sub-entities for: '{name}'")
-        sub_results = self._search_endpoint("underenheter", name)
-        for data in sub_results:
-            org_info = self._parse_organization_data(data, EntityType.UNDERENHET, name)
-            if org_info:
-                results.append(org_info)
-        
-        # Sort by relevance score (highest first), then by entity type preference
-        results.sort(key=lambda x: (x.relevance_score, x.entity_type == EntityType.HOVEDENHET), reverse=True)
+        results = []
+        for (endpoint, (entity_type, _)), items in zip(self.ENDPOINTS.items(), pages):
+            for data in items:
+                org_info = self._parse_organization_data(data, entity_type, name)
+                if org_info:
+                    results.append(org_info)
         
+        self._sort_by_relevance(results)
         return results
     
-    def _search_endpoint(self, endpoint: str, name: str) -> List[Dict]:
+    async def search_many(self, names: Iterable[str], filters: Optional[SearchFilters] = None) -> List[List[OrganizationInfo]]:
+        """Run several name searches concurrently, returning results in input order."""
+        return list(await asyncio.gather(*(self.search_by_name(name, filters) for name in names)))
+    
+    async def _search_endpoint(self, endpoint: str, name: str, filters: Optional[SearchFilters] = None) -> List[Dict]:
         """Search a specific endpoint for organizations by name."""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            params = {'navn': name, 'size': MAX_SEARCH_RESULTS}
-            
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('_embedded', {}).get(endpoint, [])
-        except requests.RequestException as e:
-            print(f"⚠️  Error searching {endpoint}: {e}")
+        params = dict(self._search_params(endpoint, name, filters), size=MAX_SEARCH_RESULTS)
+        data = await self._get_json(f"{self.base_url}/{endpoint}", params)
+        return data.get('_embedded', {}).get(endpoint, []) if data else []
+    
+    async def _lookup_batch(self, endpoint: str, org_numbers: List[str], entity_type: EntityType) -> Dict[str, OrganizationInfo]:
+        """Fetch organizations from an endpoint, sending all chunks concurrently."""
+        url = f"{self.base_url}/{endpoint}"
+        chunks = [org_numbers[start:start + MAX_BATCH_LOOKUP_SIZE]
+                  for start in range(0, len(org_numbers), MAX_BATCH_LOOKUP_SIZE)]
+        pages = await asyncio.gather(*(
+            self._get_json(url, {'organisasjonsnummer': ",".join(chunk), 'size': len(chunk)})
+            for chunk in chunks
+        ))
         
-        return []
+        found: Dict[str, OrganizationInfo] = {}
+        for data in pages:
+            for item in (data or {}).get('_embedded', {}).get(endpoint, []):
+                org_info = self._parse_organization_data(item, entity_type)
+                if org_info:
+                    found[org_info.org_number] = org_info
+        
+        return found
     
-    def _parse_organization_data(self, data: Dict, entity_type: EntityType, query: Optional[str] = None) -> Optional[OrganizationInfo]:
-        """Parse raw API data into OrganizationInfo object."""
-        try:
-            # Extract basic information
-            name = data.get('navn', 'Navn ikke tilgjengelig')
-            org_number = data.get('organisasjonsnummer', 'N/A')
-            
-            # Calculate relevance score if query is provided
-            relevance_score = 0.0
-            if query:
-                relevance_score = TextMatcher.calculate_relevance_score(query, name)
-            
-            # Parse addresses
-            business_address = self._parse_address(data.get('forretningsadresse'))
-            postal_address = self._parse_address(data.get('postadresse'))
-            
-            # Extract additional information
-            org_form = None
-            if data.get('organisasjonsform'):
-                org_form = data['organisasjonsform'].get('beskrivelse')
-            
-            industry_code = None
-            if data.get('naeringskode1'):
-                industry_code = data['naeringskode1'].get('beskrivelse')
-            
-            return OrganizationInfo(
-                name=name,
-                org_number=org_number,
-                entity_type=entity_type,
-                business_address=business_address,
-                postal_address=postal_address,
-                organization_form=org_form,
-                industry_code=industry_code,
-                relevance_score=relevance_score
+    async def _get_json(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """GET a URL within the concurrency bound, returning the JSON body on 200.
+        
+        Raises:
+            BRREGThrottledError: If the API answers 429 Too Many Requests
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=self.HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
             )
-        except Exception as e:
-            print(f"⚠️  Error parsing organization data: {e}")
-            return None
-    
-    def _parse_address(self, address_data: Optional[Dict]) -> Optional[Address]:
-        """Parse address data from API response."""
-        if not address_data:
-            return None
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        street_lines = address_data.get('adresse', [])
-        postal_code = address_data.get('postnummer')
-        city = address_data.get('poststed')
+        async with self._semaphore:
+            try:
+                async with self._session.get(url, params=params) as response:
+                    if response.status == 429:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        raise BRREGThrottledError(url, retry_after)
+                    if response.status == 200:
+                        return self._decode_json(await response.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError, requests.exceptions.InvalidJSONError) as e:
+                print(f"⚠️  Error requesting {url}: {e}")
         
-        return Address(
-            street_lines=street_lines or [],
-            postal_code=postal_code,
-            city=city
-        )
+        return None
 
 
 class OrganizationDisplayFormatter:
@@ -430,6 +3867,11 @@ def create_argument_parser() -> argparse.ArgumentParser:
   python brreg_lookup.py -name "FJORDKRAFT AS AVD SORTLAND"
   python brreg_lookup.py --number 923609016
   python brreg_lookup.py --name "EQUINOR ASA"
+  python brreg_lookup.py --name "FJORDKRAFT" --exhaustive
+  python brreg_lookup.py --name "FJORDKRAFT" --municipality 0301 --org-form AS
+  python brreg_lookup.py mirror build
+  python brreg_lookup.py mirror sync
+  python brreg_lookup.py --number 923609016 --mirror
 
 🔍 Features:
   • Searches both main entities (enheter) and sub-entities (underenheter)
@@ -450,19 +3892,223 @@ def create_argument_parser() -> argparse.ArgumentParser:
         help='Organization name for search (minimum 3 characters)',
         metavar='ORG_NAME'
     )
+    filters = parser.add_argument_group('name search filters (applied by the API)')
+    filters.add_argument('--municipality', metavar='NUMBERS',
+                         help='Comma-separated municipality numbers (kommunenummer), e.g. 0301,4601')
+    filters.add_argument('--industry-code', metavar='CODES',
+                         help='Comma-separated industry codes (naeringskode), e.g. 35.140')
+    filters.add_argument('--org-form', metavar='CODES',
+                         help='Comma-separated organization form codes (organisasjonsform), e.g. AS,ASA')
+    filters.add_argument('--postal-code', metavar='CODES',
+                         help='Comma-separated postal address postal codes (postadresse.postnummer)')
+    filters.add_argument('--registered-from', metavar='YYYY-MM-DD', type=date.fromisoformat,
+                         help='Earliest registration date in Enhetsregisteret')
+    filters.add_argument('--registered-to', metavar='YYYY-MM-DD', type=date.fromisoformat,
+                         help='Latest registration date in Enhetsregisteret')
+    
+    parser.add_argument(
+        '--exhaustive',
+        action='store_true',
+        help='Retrieve every name search result, splitting oversized searches into shards'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        default=DEFAULT_RESPONSE_CACHE_DIR,
+        metavar='DIR',
+        help=f'Directory of the persistent response cache (default: {DEFAULT_RESPONSE_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always query the API, bypassing the persistent response cache'
+    )
+    parser.add_argument(
+        '--probe-mode',
+        choices=[mode.value for mode in ProbeMode],
+        default=ProbeMode.SEQUENTIAL.value,
+        help='How number lookups probe main and sub-entities (default: sequential)'
+    )
+    parser.add_argument(
+        '--mirror',
+        action='store_true',
+        help="Answer from the local mirror instead of the API (create it with 'mirror build')"
+    )
+    parser.add_argument(
+        '--mirror-dir',
+        type=Path,
+        default=DEFAULT_MIRROR_DIR,
+        metavar='DIR',
+        help=f'Directory of the local mirror (default: {DEFAULT_MIRROR_DIR})'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        metavar='SECONDS',
+        help='Upper bound on the time spent on the lookup or search; searches return partial results'
+    )
+    
+    return parser
+
+
+def create_mirror_argument_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the ``mirror`` command."""
+    parser = argparse.ArgumentParser(
+        prog='brreg_lookup.py mirror',
+        description='📦 BRREG API Lookup Tool - Local mirror of the register built from the bulk downloads'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help='Download the full register and build the mirror')
+    build.add_argument('--mirror-dir', type=Path, default=DEFAULT_MIRROR_DIR, metavar='DIR',
+                       help=f'Directory of the local mirror (default: {DEFAULT_MIRROR_DIR})')
+    build.add_argument('--workers', type=int, default=DEFAULT_INGEST_WORKERS, metavar='N',
+                       help=f'Processes decoding the bulk data; 0 builds in a single process '
+                            f'(default: {DEFAULT_INGEST_WORKERS})')
+    
+    sync = subparsers.add_parser('sync', help='Apply the changes since the last build or sync')
+    sync.add_argument('--mirror-dir', type=Path, default=DEFAULT_MIRROR_DIR, metavar='DIR',
+                      help=f'Directory of the local mirror (default: {DEFAULT_MIRROR_DIR})')
+    sync.add_argument('--interval', type=float, metavar='SECONDS',
+                      help='Keep syncing, waiting this long between runs')
     
     return parser
 
 
+def mirror_main(argv: List[str]) -> None:
+    """Entry point of the ``mirror`` command."""
+    args = create_mirror_argument_parser().parse_args(argv)
+    
+    try:
+        if args.command == 'build':
+            build_mirror(args.mirror_dir, args.workers)
+        elif args.command == 'sync':
+            sync_mirror(args.mirror_dir, args.interval)
+    except (requests.RequestException, BRREGError, OSError, ValueError) as e:
+        print(f"\n❌ Mirror {args.command} failed: {e}")
+        print("💡 Please check your internet connection and available disk space, then try again")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Operation cancelled by user")
+        sys.exit(1)
+
+
+def build_mirror(mirror_dir: Path, workers: int) -> None:
+    """Download the bulk files and build the mirror while they download.
+    
+    The downloads are kept until the build succeeds, so an interrupted
+    build resumes them instead of starting over.
+    """
+    print(f"📦 Building local mirror in {mirror_dir}")
+    start = time.monotonic()
+    
+    with BRREGClient() as client:
+        downloads = {endpoint: client.download_bulk_file(endpoint, mirror_dir / 'downloads')
+                     for endpoint in BULK_DOWNLOAD_ACCEPT}
+        for endpoint, download in downloads.items():
+            if download.resumed_bytes:
+                print(f"📦 Resuming {endpoint} download: {download.resumed_bytes / 1e6:,.0f} of "
+                      f"{download.size / 1e6:,.0f} MB already downloaded")
+        
+        try:
+            if workers > 0:
+                streams = {endpoint: functools.partial(open_bulk_file, download.path)
+                           for endpoint, download in downloads.items()}
+                mirror = LocalMirror.build_parallel(mirror_dir, streams, workers)
+            else:
+                sources = {endpoint: read_bulk_file(download.path) for endpoint, download in downloads.items()}
+                mirror = LocalMirror.build(mirror_dir, sources)
+        except BaseException:
+            for download in downloads.values():
+                download.cancel()
+            raise
+        
+        for download in downloads.values():
+            download.result()
+            download.remove()
+    
+    print(f"✅ Mirror built: {mirror.count():,} organizations in {time.monotonic() - start:.0f}s")
+    mirror.close()
+
+
+def sync_mirror(mirror_dir: Path, interval: Optional[float] = None) -> None:
+    """Sync the mirror once, or every ``interval`` seconds until interrupted."""
+    mirror = LocalMirror(mirror_dir)
+    if not mirror.is_built:
+        print(f"❌ Error: No local mirror in {mirror_dir}")
+        print("💡 Build it first with: python brreg_lookup.py mirror build")
+        sys.exit(1)
+    client = BRREGClient(mirror=mirror)
+    
+    while True:
+        start = time.monotonic()
+        try:
+            stats = client.sync_mirror()
+        except BRREGRequestError as e:
+            if not interval:
+                raise
+            # Applied pages are kept; the next run resumes from the checkpoint
+            print(f"⚠️  Sync failed, retrying in {interval:.0f}s: {e}")
+        else:
+            print(f"✅ Mirror synced in {time.monotonic() - start:.1f}s: "
+                  f"{sum(s.updated for s in stats.values()):,} updated, "
+                  f"{sum(s.deleted for s in stats.values()):,} deleted")
+        if not interval:
+            break
+        time.sleep(interval)
+    
+    client.close()
+    mirror.close()
+
+
+def build_search_filters(args: argparse.Namespace) -> Optional[SearchFilters]:
+    """Build server-side search filters from the command line arguments, if any were given."""
+    def split(value: Optional[str]) -> Tuple[str, ...]:
+        return tuple(part.strip() for part in value.split(",") if part.strip()) if value else ()
+    
+    filters = SearchFilters(
+        municipality_numbers=split(args.municipality),
+        industry_codes=split(args.industry_code),
+        organization_forms=split(args.org_form),
+        postal_codes=split(args.postal_code),
+        registered_from=args.registered_from,
+        registered_to=args.registered_to
+    )
+    return filters if filters != SearchFilters() else None
+
+
 def main() -> None:
     """Main application entry point with professional error handling."""
+    if sys.argv[1:2] == ['mirror']:
+        mirror_main(sys.argv[2:])
+        return
+    
     try:
         # Parse command line arguments
         parser = create_argument_parser()
         args = parser.parse_args()
+        filters = build_search_filters(args)
+        
+        if filters and args.number:
+            parser.error("search filters can only be used with --name")
         
         # Initialize BRREG client
-        client = BRREGClient()
+        response_cache = None
+        if not args.no_cache:
+            try:
+                response_cache = ResponseCache(args.cache_dir)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Response cache unavailable, continuing without it: {e}")
+        
+        mirror = None
+        if args.mirror:
+            mirror = LocalMirror(args.mirror_dir)
+            if not mirror.is_built:
+                print(f"❌ Error: No local mirror in {args.mirror_dir}")
+                print("💡 Build it first with: python brreg_lookup.py mirror build")
+                sys.exit(1)
+        
+        client = BRREGClient(probe_mode=ProbeMode(args.probe_mode), response_cache=response_cache, mirror=mirror)
         formatter = OrganizationDisplayFormatter()
         
         print("=" * 70)
@@ -480,7 +4126,7 @@ def main() -> None:
             print(f"🔍 Looking up organization number: {org_number}")
             print("-" * 50)
             
-            result = client.lookup_by_number(org_number)
+            result = client.lookup_by_number(org_number, time_budget=args.time_budget)
             
             if not result:
                 print("❌ Organization not found in BRREG registry")
@@ -500,7 +4146,10 @@ def main() -> None:
             print(f"🔍 Searching for organizations matching: '{org_name}'")
             print("-" * 50)
             
-            results = client.search_by_name(org_name)
+            if args.exhaustive:
+                results = client.search_exhaustive(org_name, filters=filters, time_budget=args.time_budget)
+            else:
+                results = client.search_by_name(org_name, filters=filters, time_budget=args.time_budget)
             
             if not results:
                 print("❌ No organizations found matching the search criteria")
@@ -512,6 +4161,18 @@ def main() -> None:
         print("\n" + "=" * 70)
         print("✅ Lookup completed successfully")
         
+    except BRREGDeadlineExceeded as e:
+        print(f"\n❌ {e}")
+        print("💡 Try again, or allow more time with a larger --time-budget")
+        sys.exit(1)
+    except BRREGThrottledError as e:
+        print(f"\n❌ {e}")
+        print("💡 The register is limiting request rates; please wait a moment and try again")
+        sys.exit(1)
+    except BRREGRequestError as e:
+        print(f"\n❌ {e}")
+        print("💡 Please check your internet connection and try again")
+        sys.exit(1)
     except KeyboardInterrupt:
         print("\n\n⚠️  Operation cancelled by user")
         sys.exit(1)
@@ -0,0 +1,543 @@
+"""Tests for BRREGClient request handling."""
+
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from benchmarks import STAND_IN_ORG_NUMBER_BASE, StandInHandler, make_entity, stand_in_server
+from brreg_lookup import (MAX_BATCH_LOOKUP_SIZE, MAX_RESULT_WINDOW, RATE_DECREASE_FACTOR, RATE_INCREASE_STEP,
+                          BRREGCircuitOpenError, BRREGClient, BRREGDeadlineExceeded, BRREGRequestError,
+                          BRREGThrottledError, CircuitBreaker, CircuitState, EntityType, LookupCache, OrganizationInfo,
+                          RateLimiter, ResponseCache, RetryBudget, RetryPolicy, Validators)
+
+
+class SearchStandInHandler(StandInHandler):
+    """Answers searches with ``total`` results, failing the (page, size) requests in ``failures``.
+    
+    A failure status of 200 answers with a body that is not JSON.
+    """
+
+    total = 0
+    failures: Dict[Tuple[int, int], int] = {}
+
+    def do_GET(self) -> None:
+        query = parse_qs(urlsplit(self.path).query)
+        if "page" not in query:
+            self._reply(404, b'{"status": 404}')
+            return
+        page, size = int(query["page"][0]), int(query["size"][0])
+        status = self.failures.get((page, size))
+        if status == 200:
+            self._reply(200, b"<html>")
+        elif status is not None:
+            self._reply(status, json.dumps({"status": status}).encode())
+        else:
+            first = page * size
+            entities = [make_entity(str(STAND_IN_ORG_NUMBER_BASE + i))
+                        for i in range(first, min(first + size, self.total))]
+            self._reply(200, json.dumps({
+                "_embedded": {"enheter": entities},
+                "page": {"size": size, "totalElements": self.total,
+                         "totalPages": math.ceil(self.total / size), "number": page},
+            }).encode())
+
+
+class BatchStandInHandler(StandInHandler):
+    """Answers multi-value number lookups for the numbers in ``main`` and ``sub``, logging each query."""
+
+    main: Set[str] = set()
+    sub: Set[str] = set()
+    queries: List[Tuple[str, List[str]]] = []
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        endpoint = url.path.strip("/").split("/")[-1]
+        numbers = parse_qs(url.query)["organisasjonsnummer"][0].split(",")
+        self.queries.append((endpoint, numbers))
+        known = self.main if endpoint == "enheter" else self.sub
+        entities = [make_entity(nr) for nr in numbers if nr in known]
+        self._reply(200, json.dumps({"_embedded": {endpoint: entities}} if entities else {}).encode())
+
+
+class TruncatingHandler(StandInHandler):
+    """Cuts off the body of the first ``truncated[0]`` responses, then answers normally."""
+
+    truncated = [0]
+
+    def do_GET(self) -> None:
+        if self.truncated[0] > 0:
+            self.truncated[0] -= 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            self.wfile.write(b'{"organisasjonsnummer": ')
+            self.close_connection = True
+            return
+        super().do_GET()
+
+
+class ETagHandler(StandInHandler):
+    """Answers entity lookups with an ETag, and 304 to requests that already hold it."""
+
+    etag = '"v1"'
+    conditional: List[Optional[str]] = []
+
+    def do_GET(self) -> None:
+        self.conditional.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        body = json.dumps(make_entity(self.path.rstrip("/").split("/")[-1])).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ThrottlingHandler(StandInHandler):
+    """Answers the first ``throttled[0]`` requests with 429 and a Retry-After of ``retry_after``."""
+
+    throttled = [0]
+    retry_after = "0"
+
+    def do_GET(self) -> None:
+        if self.throttled[0] > 0:
+            self.throttled[0] -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", self.retry_after)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def organization(org_number: str) -> OrganizationInfo:
+    return OrganizationInfo(name=f"SELSKAP {org_number} AS", org_number=org_number, entity_type=EntityType.HOVEDENHET)
+
+
+class ExhaustedRateLimiter:
+    """Rate limiter stand-in that never grants a slot."""
+
+    def acquire(self, timeout=None):
+        return False
+
+    def release(self, status=None, retry_after=None):
+        pass
+
+
+def test_rate_limiter_timeout_releases_half_open_trial():
+    client = BRREGClient(base_url="http://127.0.0.1:9/api", rate_limiter=ExhaustedRateLimiter(),
+                         circuit_failure_threshold=1, circuit_reset_timeout=0.01)
+    breaker = client.circuit_breaker("enheter")
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    with pytest.raises(BRREGDeadlineExceeded):
+        client._send("http://127.0.0.1:9/api/enheter/923609016", deadline=time.monotonic() + 0.05)
+
+    # The abandoned trial must not keep the circuit from trying again
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()
+    client.close()
+
+
+def test_budgeted_lookup_does_not_cut_short_concurrent_lookups():
+    client = BRREGClient(base_url="http://127.0.0.1:9/api")
+    found = object()
+
+    def fetch(org_number, mode, deadline=None):
+        time.sleep(0.3)
+        if deadline is not None and time.monotonic() >= deadline:
+            raise BRREGDeadlineExceeded(f"{client.base_url}/enheter/{org_number}")
+        return found
+
+    client._fetch_organization = fetch
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        budgeted = pool.submit(client.lookup_by_number, "923609016", time_budget=0.2)
+        time.sleep(0.05)
+        unbounded = pool.submit(client.lookup_by_number, "923609016")
+
+        with pytest.raises(BRREGDeadlineExceeded):
+            budgeted.result()
+        assert unbounded.result() is found
+    client.close()
+
+
+def test_retry_budget_does_not_bank_retries_from_healthy_traffic():
+    budget = RetryBudget(ratio=0.1, reserve=10)
+    for _ in range(100000):
+        budget.record_request()
+
+    spent = 0
+    while budget.try_spend():
+        spent += 1
+    assert spent == 10
+
+
+@pytest.mark.parametrize("status, error", [(500, BRREGRequestError), (429, BRREGThrottledError)])
+def test_iter_search_raises_on_failed_page(status, error):
+    with stand_in_server(SearchStandInHandler, total=6, failures={(1, 2): status}) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=1))
+        seen = []
+        with pytest.raises(error) as raised:
+            for org_info in client.iter_search("Benchmark", page_size=2):
+                seen.append(org_info.org_number)
+        client.close()
+
+    assert raised.value.status == status
+    # The first page was yielded; nothing after the failed page was
+    assert len(seen) == 2
+
+
+def test_iter_search_raises_on_invalid_json_page():
+    with stand_in_server(SearchStandInHandler, total=6, failures={(1, 2): 200}) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=1))
+        with pytest.raises(BRREGRequestError, match="page 1"):
+            list(client.iter_search("Benchmark", page_size=2))
+        client.close()
+
+
+@pytest.mark.parametrize("status", [500, 429])
+def test_search_exhaustive_marks_failed_shard_page_partial(status):
+    with stand_in_server(SearchStandInHandler, total=4, failures={(1, 2): status}) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=1))
+        results = client.search_exhaustive("Benchmark", endpoint="enheter", page_size=2)
+        client.close()
+
+    assert sorted(org.org_number for org in results) == [str(STAND_IN_ORG_NUMBER_BASE + i) for i in range(2)]
+    assert results.partial
+
+
+@pytest.mark.parametrize("status", [500, 429])
+def test_search_exhaustive_marks_failed_count_partial(status):
+    with stand_in_server(SearchStandInHandler, total=4, failures={(0, 1): status}) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=1))
+        results = client.search_exhaustive("Benchmark", endpoint="enheter", page_size=2)
+        client.close()
+
+    assert list(results) == []
+    assert results.partial
+
+
+def test_search_exhaustive_marks_truncated_shard_partial():
+    with stand_in_server(SearchStandInHandler, total=MAX_RESULT_WINDOW + 1) as base_url:
+        client = BRREGClient(base_url=base_url)
+        client._split_shard = lambda endpoint, params, deadline=None: []
+        results = client.search_exhaustive("Benchmark", endpoint="enheter", page_size=MAX_RESULT_WINDOW // 2)
+        client.close()
+
+    assert len(results) == MAX_RESULT_WINDOW
+    assert results.partial
+
+
+def test_search_exhaustive_complete_result_is_not_partial():
+    with stand_in_server(SearchStandInHandler, total=5) as base_url:
+        client = BRREGClient(base_url=base_url)
+        results = client.search_exhaustive("Benchmark", endpoint="enheter", page_size=2)
+        client.close()
+
+    assert len(results) == 5
+    assert not results.partial
+
+
+def test_lookup_many_batches_numbers_per_query():
+    numbers = [str(STAND_IN_ORG_NUMBER_BASE + i) for i in range(250)]
+    queries = []
+    with stand_in_server(BatchStandInHandler, main=set(numbers), queries=queries) as base_url:
+        client = BRREGClient(base_url=base_url)
+        results = client.lookup_many(numbers)
+        client.close()
+
+    sizes = [(endpoint, len(chunk)) for endpoint, chunk in queries]
+    assert sizes == [("enheter", MAX_BATCH_LOOKUP_SIZE), ("enheter", MAX_BATCH_LOOKUP_SIZE), ("enheter", 50)]
+    assert [nr for nr, org_info in results] == numbers
+    assert all(org_info.org_number == nr for nr, org_info in results)
+    assert not results.partial
+
+
+def test_lookup_many_queries_sub_entities_only_for_misses():
+    numbers = [str(STAND_IN_ORG_NUMBER_BASE + i) for i in range(5)]
+    queries = []
+    with stand_in_server(BatchStandInHandler, main=set(numbers[:2]), sub={numbers[2]}, queries=queries) as base_url:
+        client = BRREGClient(base_url=base_url)
+        results = dict(client.lookup_many(numbers))
+        client.close()
+
+    assert queries == [("enheter", numbers), ("underenheter", numbers[2:])]
+    types = [results[nr].entity_type for nr in numbers[:3]]
+    assert types == [EntityType.HOVEDENHET, EntityType.HOVEDENHET, EntityType.UNDERENHET]
+    assert results[numbers[3]] is None and results[numbers[4]] is None
+
+
+def test_lookup_many_never_sends_malformed_numbers():
+    queries = []
+    with stand_in_server(BatchStandInHandler, main={"910000001", "910000002"}, queries=queries) as base_url:
+        client = BRREGClient(base_url=base_url)
+        results = client.lookup_many(["910000001", "abc", " 910000002 ", "12345", "910000001"])
+        client.close()
+
+    assert queries == [("enheter", ["910000001", "910000002"])]
+    assert [(nr, org_info is not None) for nr, org_info in results] == [
+        ("910000001", True), ("abc", False), ("910000002", True), ("12345", False), ("910000001", True),
+    ]
+
+
+def test_body_cut_off_mid_transfer_is_retried():
+    truncated = [1]
+    with stand_in_server(TruncatingHandler, truncated=truncated) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+        response = client._send(f"{base_url}/enheter/923609016")
+        client.close()
+
+    assert truncated == [0]
+    assert response.status_code == 200
+    assert response.json()["organisasjonsnummer"] == "923609016"
+
+
+def test_malformed_request_is_not_retried_or_counted_against_circuit():
+    client = BRREGClient(base_url="htp://127.0.0.1:9/api", circuit_failure_threshold=1)
+    with pytest.raises(requests.exceptions.InvalidSchema):
+        client._send(f"{client.base_url}/enheter/923609016")
+    assert client.circuit_breaker("enheter").state == CircuitState.CLOSED
+    client.close()
+
+
+def test_lookup_cache_serves_entries_until_their_ttl():
+    clock = FakeClock()
+    cache = LookupCache(ttl=10, negative_ttl=1, stale_ttl=0, clock=clock)
+    cache.put("910000001", organization("910000001"))
+
+    clock.advance(9.9)
+    hit, org_info = cache.get("910000001")
+    assert hit and org_info.org_number == "910000001"
+
+    clock.advance(0.1)
+    assert cache.get("910000001") == (False, None)
+    assert len(cache) == 0  # Without validators there is nothing to revalidate
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 1, 1)
+
+
+def test_lookup_cache_keeps_confirmed_misses_for_the_negative_ttl():
+    clock = FakeClock()
+    cache = LookupCache(ttl=10, negative_ttl=1, stale_ttl=0, clock=clock)
+    cache.put("910000001", organization("910000001"))
+    cache.put("999999999", None)
+
+    assert cache.get("999999999") == (True, None)
+    clock.advance(1)
+    assert cache.get("999999999") == (False, None)
+    assert cache.get("910000001")[0]
+    assert cache.stats.negative_hits == 1
+
+
+def test_lookup_cache_evicts_least_recently_used():
+    cache = LookupCache(max_size=2, clock=FakeClock())
+    cache.put("910000001", organization("910000001"))
+    cache.put("910000002", organization("910000002"))
+    cache.get("910000001")  # Now the most recently used
+    cache.put("910000003", organization("910000003"))
+
+    assert cache.get("910000002") == (False, None)
+    assert cache.get("910000001")[0] and cache.get("910000003")[0]
+    assert cache.stats.evictions == 1
+
+
+def test_lookup_cache_of_size_zero_caches_nothing():
+    cache = LookupCache(max_size=0)
+    cache.put("910000001", organization("910000001"))
+    assert cache.get("910000001") == (False, None)
+    assert len(cache) == 0
+
+
+def test_response_cache_is_shared_through_wal_database(tmp_path):
+    writer = ResponseCache(tmp_path)
+    reader = ResponseCache(tmp_path)
+    key = ResponseCache.make_key("https://example.test/enheter/910000001")
+    writer.put(key, 200, b'{"navn": "SELSKAP AS"}')
+
+    assert reader.get(key).body == b'{"navn": "SELSKAP AS"}'
+    assert writer._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    writer.close()
+    reader.close()
+
+
+def test_response_cache_expires_responses_by_status(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path, ttl=60, negative_ttl=5, clock=clock)
+    found, missing, failed = (ResponseCache.make_key(f"https://example.test/enheter/{nr}")
+                              for nr in ("910000001", "999999999", "910000002"))
+    cache.put(found, 200, b"{}", Validators(etag='"v1"'))
+    cache.put(missing, 404, b"{}")
+    cache.put(failed, 500, b"{}")
+
+    assert cache.get(failed) is None  # Only 200 and 404 are cached
+    clock.advance(5)
+    assert cache.get(missing) is None
+    assert cache.get(found) is not None
+    clock.advance(55)
+    assert cache.get(found) is None
+    # Kept past its TTL, so it can be revalidated
+    assert cache.get_expired(found).validators == Validators(etag='"v1"')
+    cache.close()
+
+
+def test_response_cache_evicts_least_recently_used_beyond_max_bytes(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path, max_bytes=256 * 1024, clock=clock)
+    keys = [ResponseCache.make_key(f"https://example.test/enheter/{910000000 + i}") for i in range(100)]
+    cache.put(keys[0], 200, b"x" * 8192)
+    for key in keys[1:]:
+        clock.advance(1)
+        cache.get(keys[0])  # Kept in use, so never the least recently used
+        cache.put(key, 200, b"x" * 8192)
+
+    assert cache.size() <= 256 * 1024
+    assert cache.get(keys[0]) is not None and cache.get(keys[-1]) is not None
+    assert cache.get(keys[1]) is None
+    cache.close()
+
+
+def test_expired_response_is_revalidated_with_a_conditional_request(tmp_path):
+    clock = FakeClock()
+    conditional = []
+    with stand_in_server(ETagHandler, conditional=conditional) as base_url:
+        client = BRREGClient(base_url=base_url, response_cache=ResponseCache(tmp_path, ttl=60, clock=clock))
+        url = f"{base_url}/enheter/910000001"
+        first = client._get_json(url)
+        cached = client._get_json(url)
+        clock.advance(60)
+        revalidated = client._get_json(url)
+        renewed = client._get_json(url)
+        stats = client.revalidation_stats
+        client.close()
+
+    # One full download, one 304, and both cache hits sent nothing
+    assert conditional == [None, '"v1"']
+    assert first.data == cached.data == revalidated.data == renewed.data
+    assert revalidated.status == 200
+    assert (stats.not_modified, stats.bytes_saved) == (1, first.size)
+
+
+def test_rate_limiter_halves_rate_and_pauses_on_429():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, min_rate=1, max_concurrency=8, clock=clock)
+    assert limiter.acquire(timeout=0)
+    limiter.release(429, retry_after=2)
+
+    assert limiter.current_rate == 10 * RATE_DECREASE_FACTOR
+    assert limiter.concurrency_limit == int(8 * RATE_DECREASE_FACTOR)
+    assert not limiter.acquire(timeout=0)  # Everyone waits out the Retry-After
+    clock.advance(2)
+    assert limiter.acquire(timeout=0)
+    limiter.release(200)
+
+
+def test_rate_limiter_increases_additively_within_bounds():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, min_rate=2, max_rate=12, clock=clock)
+    limiter.release(200)
+    assert limiter.current_rate == 10 + RATE_INCREASE_STEP / 10
+
+    for _ in range(1000):
+        limiter.release(200)
+    assert limiter.current_rate == 12
+    for _ in range(10):
+        limiter.release(429)
+    assert limiter.current_rate == 2
+    assert limiter.concurrency_limit >= 1
+
+
+def test_client_backs_off_when_throttled():
+    throttled = [1]
+    limiter = RateLimiter(rate=50)
+    with stand_in_server(ThrottlingHandler, throttled=throttled, retry_after="0.3") as base_url:
+        client = BRREGClient(base_url=base_url, rate_limiter=limiter)
+        start = time.monotonic()
+        response = client._send(f"{base_url}/enheter/923609016")
+        elapsed = time.monotonic() - start
+        client.close()
+
+    assert response.status_code == 200
+    assert elapsed >= 0.3  # The retry waited for Retry-After
+    assert limiter.current_rate < 50
+    assert limiter.in_flight == 0
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    events = []
+    breaker = CircuitBreaker("enheter", failure_threshold=3, reset_timeout=30, listeners=[events.append],
+                             clock=clock)
+    breaker.record_failure()
+    breaker.record_success()  # Only consecutive failures count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in == 30
+    assert [(event.previous, event.state) for event in events] == [(CircuitState.CLOSED, CircuitState.OPEN)]
+
+
+def test_circuit_breaker_lets_one_trial_through_when_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker("enheter", failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+
+    assert breaker.allow()  # The trial request
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_open_circuit_serves_expired_cached_response(tmp_path):
+    clock = FakeClock()
+    with stand_in_server() as base_url:
+        client = BRREGClient(base_url=base_url, response_cache=ResponseCache(tmp_path, ttl=60, clock=clock),
+                             circuit_failure_threshold=1)
+        url = f"{base_url}/enheter/910000001"
+        fetched = client._get_json(url)
+        clock.advance(60)
+        client.circuit_breaker("enheter").record_failure()
+
+        served = client._get_json(url)
+        with pytest.raises(BRREGCircuitOpenError):
+            client._get_json(f"{base_url}/enheter/910000002")  # Nothing cached to fall back on
+        client.close()
+
+    assert served.data == fetched.data
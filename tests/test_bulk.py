@@ -0,0 +1,308 @@
+"""Tests for bulk file downloads, streaming and mirror builds."""
+
+import contextlib
+import functools
+import gzip
+import io
+import json
+import queue
+import sqlite3
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import brreg_lookup
+from benchmarks import (STAND_IN_ORG_NUMBER_BASE, BulkStandInHandler, StandInHandler, make_bulk_file, make_entity,
+                        stand_in_server)
+from brreg_lookup import (MIRROR_UPDATE_FEEDS, BRREGClient, BRREGIngestError, BRREGRequestError, BulkDownload,
+                          EntityType, LocalMirror, RetryPolicy, iter_json_array, read_bulk_file)
+
+
+def started_download(tmp_path, size=10):
+    """A BulkDownload whose manifest says nothing has been fetched yet."""
+    client = BRREGClient(base_url="http://127.0.0.1:9/api")
+    download = BulkDownload(client, "http://127.0.0.1:9/api/enheter/lastned", tmp_path / "enheter.json.gz",
+                            segment_size=size)
+    download.path.write_bytes(b"\0" * size)
+    download._manifest = dict(url=download.url, size=size, segments={}, complete=False, prefix=0, error=None)
+    download._pending.append(0)
+    download._save_manifest()
+    return client, download
+
+
+def test_reader_raises_when_download_is_cancelled(tmp_path):
+    client, download = started_download(tmp_path)
+    download.cancel()
+
+    with pytest.raises(BRREGRequestError, match="cancelled"):
+        list(read_bulk_file(download.path))
+    client.close()
+
+
+def test_reader_raises_when_download_stalls(tmp_path, monkeypatch):
+    monkeypatch.setattr(brreg_lookup, "BULK_DOWNLOAD_TIMEOUT", 0.3)
+    monkeypatch.setattr(brreg_lookup, "DOWNLOAD_POLL_INTERVAL", 0.05)
+    client, download = started_download(tmp_path)
+
+    with pytest.raises(BRREGRequestError, match="no progress"):
+        list(read_bulk_file(download.path))
+    client.close()
+
+
+def test_failure_to_record_a_segment_is_reported(tmp_path, monkeypatch):
+    client, download = started_download(tmp_path)
+    monkeypatch.setattr(download, "_fetch_segment", lambda index: 0)
+
+    def disk_full():
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(download, "_save_manifest", disk_full)
+    with pytest.raises(OSError):
+        download._fetch_segments()
+    assert "No space left" in download._manifest['error']
+    client.close()
+
+
+def test_iter_json_array_does_not_split_numbers_across_chunks():
+    stream = io.BytesIO(b'[12345, 67890]')
+    assert list(iter_json_array(stream, chunk_size=3)) == [12345, 67890]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64])
+def test_iter_json_array_yields_every_element(chunk_size):
+    elements = [{"navn": "EQUINOR ASA", "organisasjonsnummer": "923609016"}, 7, "tekst", None, [1.5, True]]
+    stream = io.BytesIO(json.dumps(elements).encode())
+    assert list(iter_json_array(stream, chunk_size=chunk_size)) == elements
+
+
+def test_parallel_build_accepts_empty_array_with_whitespace(tmp_path):
+    streams = {endpoint: functools.partial(io.BytesIO, b'[\n\n]\n') for endpoint in ("enheter", "underenheter")}
+    mirror = LocalMirror.build_parallel(tmp_path, streams, workers=1)
+    assert mirror.count() == 0
+    mirror.close()
+
+
+def test_download_matches_served_file(tmp_path):
+    payload = bytes(range(256)) * 4096
+    with stand_in_server(BulkStandInHandler, payload=payload) as base_url:
+        client = BRREGClient(base_url=base_url)
+        download = BulkDownload(client, f"{base_url}/enheter/lastned", tmp_path / "enheter.json.gz",
+                                segment_size=64 * 1024, concurrency=4)
+        path = download.start().result()
+        client.close()
+
+    assert path.read_bytes() == payload
+    assert download.downloaded_bytes == len(payload)
+
+
+def test_download_leaves_client_workers_free(tmp_path):
+    payload = b"\0" * (4 * 1024 * 1024)
+    with stand_in_server(BulkStandInHandler, payload=payload, bandwidth=256 * 1024) as base_url:
+        client = BRREGClient(base_url=base_url)
+        download = BulkDownload(client, f"{base_url}/enheter/lastned", tmp_path / "enheter.json.gz",
+                                segment_size=256 * 1024, concurrency=brreg_lookup.MAX_WORKERS)
+        download.start()
+        try:
+            # Every segment fetch is running; the client's own pool must still answer at once
+            assert client.executor.submit(lambda: "free").result(timeout=1) == "free"
+        finally:
+            download.cancel()
+            with contextlib.suppress(BRREGRequestError):
+                download.result()
+            client.close()
+
+
+def mirror_rows(directory):
+    """Every mirrored row, in a stable order."""
+    with contextlib.closing(sqlite3.connect(str(directory / LocalMirror.FILENAME))) as connection:
+        return connection.execute("SELECT org_number, endpoint, name, data FROM entities "
+                                  "ORDER BY endpoint, org_number").fetchall()
+
+
+def test_parallel_build_matches_sequential_build(tmp_path):
+    # Larger than one read chunk, so the reader cuts it into several batches
+    bulk = gzip.decompress(make_bulk_file(2500))
+    assert len(bulk) > 2 * brreg_lookup.BULK_READ_CHUNK_SIZE
+    sub_entities = json.dumps([{"organisasjonsnummer": "974760673", "navn": "ÆRLIG ØL AVD BERGEN"},
+                               {"navn": "UTEN NUMMER"}], ensure_ascii=False).encode()
+    sources = {"enheter": bulk, "underenheter": sub_entities}
+
+    sequential = LocalMirror.build(tmp_path / "sequential",
+                                   {endpoint: iter_json_array(io.BytesIO(data)) for endpoint, data in sources.items()})
+    parallel = LocalMirror.build_parallel(tmp_path / "parallel",
+                                          {endpoint: functools.partial(io.BytesIO, data)
+                                           for endpoint, data in sources.items()}, workers=2)
+
+    assert parallel.count("enheter") == 2500
+    assert parallel.count("underenheter") == 1
+    assert mirror_rows(tmp_path / "parallel") == mirror_rows(tmp_path / "sequential")
+    assert len(parallel.search("ærlig øl", "underenheter")) == 1
+    sequential.close()
+    parallel.close()
+
+
+def test_parallel_build_fails_on_truncated_array(tmp_path):
+    truncated = gzip.decompress(make_bulk_file(10))[:-20]
+    with pytest.raises(BRREGIngestError):
+        LocalMirror.build_parallel(tmp_path, {"enheter": functools.partial(io.BytesIO, truncated)}, workers=1)
+    # The failed build never replaces the mirror
+    assert not (tmp_path / LocalMirror.FILENAME).exists()
+
+
+def test_reader_cuts_batches_at_element_boundaries(monkeypatch):
+    monkeypatch.setattr(brreg_lookup, "BULK_READ_CHUNK_SIZE", 256)
+    monkeypatch.setattr(brreg_lookup.signal, "signal", lambda signum, handler: None)
+    records = [make_entity(str(STAND_IN_ORG_NUMBER_BASE + i)) for i in range(40)]
+    batches, rows = queue.Queue(), queue.Queue()
+
+    brreg_lookup._read_bulk_batches(functools.partial(io.BytesIO, json.dumps(records).encode()), batches, rows, 2)
+
+    cut = []
+    while (batch := batches.get_nowait()) is not None:
+        cut.append(batch)
+    assert batches.get_nowait() is None  # One end marker per worker
+    assert rows.empty()
+    assert len(cut) > 1
+    assert [record for batch in cut for record in json.loads(b"[" + batch + b"]")] == records
+
+
+class FeedStandInHandler(StandInHandler):
+    """Serves update feeds from ``changes`` and current documents from ``documents``, by endpoint.
+    
+    Document requests for a number in ``failing`` are answered with HTTP 500,
+    and the oppdateringsid each feed request starts from is logged in ``requested``.
+    """
+
+    changes: Dict[str, List[Dict]] = {}
+    documents: Dict[str, Dict[str, Dict]] = {}
+    failing: Set[str] = set()
+    requested: List[Optional[int]] = []
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        size = int(query["size"][0])
+
+        if parts[0] == "oppdateringer":
+            endpoint = parts[1]
+            start = int(query["oppdateringsid"][0]) if "oppdateringsid" in query else None
+            self.requested.append(start)
+            page = [change for change in self.changes.get(endpoint, [])
+                    if start is None or change["oppdateringsid"] >= start][:size]
+            self._reply(200, json.dumps({"_embedded": {MIRROR_UPDATE_FEEDS[endpoint]: page}}).encode())
+            return
+
+        endpoint = parts[0]
+        numbers = query["organisasjonsnummer"][0].split(",")
+        if self.failing.intersection(numbers):
+            self._reply(500, b'{"status": 500}')
+            return
+        found = [self.documents[endpoint][nr] for nr in numbers if nr in self.documents.get(endpoint, {})]
+        self._reply(200, json.dumps({"_embedded": {endpoint: found}} if found else {}).encode())
+
+
+def change(oppdateringsid, org_number, change_type="Endring"):
+    return {"oppdateringsid": oppdateringsid, "organisasjonsnummer": org_number, "endringstype": change_type}
+
+
+def test_sync_upserts_deletes_and_advances_checkpoint(tmp_path):
+    mirror = LocalMirror.build(tmp_path, {
+        "enheter": [{"organisasjonsnummer": "910000001", "navn": "GAMMELT NAVN AS"},
+                    {"organisasjonsnummer": "910000002", "navn": "SLETTES AS"}],
+        "underenheter": [{"organisasjonsnummer": "970000001", "navn": "FJERNET AVD"}],
+    })
+    changes = {
+        "enheter": [change(5, "910000001"), change(6, "910000002", "Sletting"), change(7, "910000003", "Ny")],
+        "underenheter": [change(3, "970000001")],
+    }
+    documents = {"enheter": {"910000001": {"organisasjonsnummer": "910000001", "navn": "NYTT NAVN AS"},
+                             "910000003": {"organisasjonsnummer": "910000003", "navn": "NYSTARTET AS"}}}
+
+    with stand_in_server(FeedStandInHandler, changes=changes, documents=documents, requested=[]) as base_url:
+        client = BRREGClient(base_url=base_url)
+        stats = client.sync_mirror(mirror)
+        again = client.sync_mirror(mirror)
+        client.close()
+
+    assert (stats["enheter"].changes, stats["enheter"].updated, stats["enheter"].deleted) == (3, 2, 1)
+    # A sub-entity the API no longer returns was removed after its change
+    assert (stats["underenheter"].updated, stats["underenheter"].deleted) == (0, 1)
+    assert mirror.checkpoint("enheter") == 7 and mirror.checkpoint("underenheter") == 3
+    assert again["enheter"].changes == 0 and mirror.checkpoint("enheter") == 7
+
+    assert json.loads(mirror.get("910000001")[1])["navn"] == "NYTT NAVN AS"
+    assert mirror.get("910000002") is None and mirror.get("970000001") is None
+    assert mirror.get("910000003") is not None
+    # The name index follows renames and deletions
+    assert len(mirror.search("nytt navn", "enheter")) == 1
+    assert mirror.search("gammelt", "enheter") == []
+    assert mirror.search("slettes", "enheter") == []
+    mirror.close()
+
+
+def test_interrupted_sync_resumes_after_last_applied_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(brreg_lookup, "MIRROR_SYNC_PAGE_SIZE", 2)
+    mirror = LocalMirror.build(tmp_path, {"enheter": [], "underenheter": []})
+    numbers = [str(910000001 + i) for i in range(4)]
+    changes = {"enheter": [change(i + 1, nr, "Ny") for i, nr in enumerate(numbers)]}
+    documents = {"enheter": {nr: {"organisasjonsnummer": nr, "navn": f"SELSKAP {nr} AS"} for nr in numbers}}
+    failing = {numbers[2]}
+    requested = []
+
+    with stand_in_server(FeedStandInHandler, changes=changes, documents=documents, failing=failing,
+                         requested=requested) as base_url:
+        client = BRREGClient(base_url=base_url, retry_policy=RetryPolicy(max_attempts=1))
+        with pytest.raises(BRREGRequestError):
+            client.sync_mirror(mirror)
+        # The first page was committed with its checkpoint; the failed one left no trace
+        assert mirror.checkpoint("enheter") == 2
+        assert mirror.count("enheter") == 2
+
+        failing.clear()
+        requested.clear()
+        client.sync_mirror(mirror)
+        client.close()
+
+    assert requested[0] == 3
+    assert mirror.checkpoint("enheter") == 4
+    assert mirror.count("enheter") == 4
+    mirror.close()
+
+
+def test_client_answers_from_mirror_without_network(tmp_path):
+    mirror = LocalMirror.build(tmp_path, {
+        "enheter": [{"organisasjonsnummer": "910000001", "navn": "FJORD KRAFT AS"}],
+        "underenheter": [{"organisasjonsnummer": "970000001", "navn": "FJORD KRAFT AVD BERGEN"},
+                         {"organisasjonsnummer": "910000001", "navn": "FJORD KRAFT AS AVD"}],
+    })
+    # Nothing listens on the discard port, so any request would fail
+    client = BRREGClient(base_url="http://127.0.0.1:9/api", mirror=mirror)
+
+    org_info = client.lookup_by_number("910000001")
+    assert org_info.name == "FJORD KRAFT AS"
+    assert org_info.entity_type == EntityType.HOVEDENHET
+    assert client.lookup_by_number("970000001").entity_type == EntityType.UNDERENHET
+    assert client.lookup_by_number("999999999") is None
+    found = sorted(org.org_number for org in client.search_by_name("fjord kraft"))
+    assert found == ["910000001", "910000001", "970000001"]
+    client.close()
+    mirror.close()
+
+
+def test_rebuild_replaces_mirror(tmp_path):
+    LocalMirror.build(tmp_path, {"enheter": [{"organisasjonsnummer": "910000001", "navn": "FØRSTE AS"}]}).close()
+    rebuilt = LocalMirror.build(tmp_path, {"enheter": [{"organisasjonsnummer": "910000002", "navn": "ANDRE AS"}]})
+
+    assert rebuilt.get("910000001") is None
+    assert rebuilt.get("910000002") is not None
+    assert not (tmp_path / (LocalMirror.FILENAME + ".building")).exists()
+    rebuilt.close()
+
+
+def test_client_rejects_unbuilt_mirror(tmp_path):
+    mirror = LocalMirror(tmp_path)
+    with pytest.raises(ValueError):
+        BRREGClient(mirror=mirror)
+    mirror.close()